@@ -1,8 +1,38 @@
+import re
 from Piece import *
 from config import *
+from bitboard import *
+
+COLORS = (WHITE, BLACK)
+BACK_ROW = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+
+FEN_PIECES = 'kqbnrp'         # FEN letter of each piece type, upper case for white
+FEN_LETTERS = {color << 3 | piece_type: letter.upper() if color == 0 else letter
+               for color in range(2) for piece_type, letter in enumerate(FEN_PIECES)}
+FEN_CODES = {letter: code for code, letter in FEN_LETTERS.items()}
+SAN_PATTERN = re.compile(r'([KQRBN])?([a-h])?([1-8])?x?([a-h][1-8])(=?[QRBNqrbn])?$')
+NO_PIECES = (0,) * 6
+EMPTY_SQUARES = (None,) * 64
+FILES = 'abcdefgh'
+STARTPOS = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1'
+
+# piece-square tables per pawn direction: UP as written, DOWN mirrored vertically
+PST = (PIECE_SQUARE_TABLES, tuple(tuple(table[sq ^ 56] for sq in range(64)) for table in PIECE_SQUARE_TABLES))
+
+
+class MoveRecord:
+    # fixed-size undo entry, allocated once per ply depth and then overwritten
+    __slots__ = ('src', 'dest', 'code', 'captured', 'whiteKing', 'blackKing',
+                 'whiteScore', 'blackScore', 'whitePst', 'blackPst', 'unmoved', 'overState', 'zobrist',
+                 'halfmove')
+
+
+def color_index(color):
+    return 0 if color == WHITE else 1
+
 
 class Board:
-    
+
     def __init__(self, playerColor=WHITE):
         self.whiteScore = 10 * 8 + 30 * 4 + 50 * 2 + 90 + 1000
         self.blackScore = 10 * 8 + 30 * 4 + 50 * 2 + 90 + 1000
@@ -11,125 +41,462 @@ class Board:
         if self.playerColor == BLACK:
             self.botColor = WHITE
 
-        self.gameover = False
-        self.game_result = None
-        self.tiles = []
-        self.history = []
-        self.history_board = []
+        self.overState = None       # (gameover, game_result), None until asked for
+        self.history = []           # MoveRecord pool, reused across plies
+        self.ply = 0
+        self.halfmove = 0           # plies since the last capture or pawn move, as in FEN
+        self.fullmove = 1
+        self.history_board = []     # zobrist keys of the positions played so far
+        self.repetitions = {}       # zobrist key -> times reached in history_board
         self.turnColor = WHITE
         self.playerTurn = True if self.turnColor == self.playerColor else False
 
+        # position core: one bitboard per (color, piece type) plus a mailbox of
+        # piece codes (color << 3 | type) for O(1) lookups by square
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupancy = [0, 0]
+        self.squares = [None] * 64
+        self.unmoved = 0
+
+        # the player always sits at the bottom of the board and pushes pawns up
+        player, bot = color_index(self.playerColor), color_index(self.botColor)
+        self.pawnDir = [None, None]
+        self.pawnDir[player] = UP
+        self.pawnDir[bot] = DOWN
+        self.promotionRow = [0, 0]
+        self.promotionRow[player] = ROW_BB[0]
+        self.promotionRow[bot] = ROW_BB[7]
+        self.pst = [PST[self.pawnDir[0]], PST[self.pawnDir[1]]]
 
         # init bot
-        row = []
-        row.append(Rook(0, 0, self.botColor))        
-        row.append(Knight(1, 0, self.botColor))
-        row.append(Bishop(2, 0, self.botColor))
-        row.append(Queen(3, 0, self.botColor))
-        row.append(King(4, 0, self.botColor))
-        row.append(Bishop(5, 0, self.botColor))
-        row.append(Knight(6, 0, self.botColor))
-        row.append(Rook(7, 0, self.botColor))
-        self.tiles.append(row)
-
-        row = []
-        for i in range(8):
-            row.append(Pawn(i, 1, self.botColor))
-        self.tiles.append(row)
-
-
-        for i in range(4):
-            self.tiles.append([None, None, None, None, None, None, None, None])
-
-
-        row = []
-        for i in range(8):
-            row.append(Pawn(i, 6, self.playerColor))
-        self.tiles.append(row)
-
-        row = []
-        row.append(Rook(0, 7, self.playerColor))        
-        row.append(Knight(1, 7, self.playerColor))
-        row.append(Bishop(2, 7, self.playerColor))
-        row.append(Queen(3, 7, self.playerColor))
-        row.append(King(4, 7, self.playerColor))
-        row.append(Bishop(5, 7, self.playerColor))
-        row.append(Knight(6, 7, self.playerColor))
-        row.append(Rook(7, 7, self.playerColor))
-        self.tiles.append(row)
+        for x in range(8):
+            self.put_piece(x, bot, BACK_ROW[x])
+            self.put_piece(8 + x, bot, PAWN)
+
+        # init player
+        for x in range(8):
+            self.put_piece(48 + x, player, PAWN)
+            self.put_piece(56 + x, player, BACK_ROW[x])
+
+        self.unmoved = self.occupancy[0] | self.occupancy[1]
+
+        self.zobristTable = ZOBRIST if self.playerColor == WHITE else ZOBRIST_FLIPPED
+        self.zobrist = self.compute_zobrist()
+        # positional score next to the material one, also updated move by move
+        self.whitePst, self.blackPst = self.compute_pst()
 
         self.whiteKing = (4, 7) if self.playerColor == WHITE else (4, 0)
         self.blackKing = (4, 0) if self.whiteKing == (4, 7) else (4, 7)
 
 
-        
+    def put_piece(self, sq, color, piece_type):
+        bit = SQUARE_BB[sq]
+        self.pieces[color][piece_type] |= bit
+        self.occupancy[color] |= bit
+        self.squares[sq] = (color << 3) | piece_type
+
+
+    def compute_zobrist(self):
+        key = ZOBRIST_BLACK_TO_MOVE if self.turnColor == BLACK else 0
+        for sq in range(64):
+            if self.squares[sq] is not None:
+                key ^= self.zobristTable[self.squares[sq]][sq]
+
+        return key
+
+
+    def compute_pst(self):
+        scores = [0, 0]
+        for sq in range(64):
+            code = self.squares[sq]
+            if code is not None:
+                scores[code >> 3] += self.pst[code >> 3][code & 7][sq]
+
+        return scores
+
+
+    def zobrist_after(self, src, dest):
+        # key of the position after src -> dest without playing the move
+        table = self.zobristTable
+        code = self.squares[src]
+        captured = self.squares[dest]
+        key = self.zobrist ^ ZOBRIST_BLACK_TO_MOVE ^ table[code][src]
+        if captured is not None:
+            key ^= table[captured][dest]
+        if code & 7 == PAWN and SQUARE_BB[dest] & self.promotionRow[code >> 3]:
+            code = (code & 8) | QUEEN
+
+        return key ^ table[code][dest]
+
+
+    def push_history(self):
+        # remember the current game position for the repetition rule of get_moves
+        self.history_board.append(self.zobrist)
+        self.repetitions[self.zobrist] = self.repetitions.get(self.zobrist, 0) + 1
+
+
+    def set_fen(self, fen):
+        # loads a FEN position keeping this board's orientation; castling and en passant
+        # fields are accepted but ignored since the rules have neither. Everything is
+        # rebuilt in place, so one board can be reused to load many positions
+        fields = fen.split()
+        if not fields or (len(fields) > 1 and fields[1] not in ('w', 'b')):
+            raise ValueError(f'invalid FEN: {fen!r}')
+
+        pieces = self.pieces
+        pieces[0][:] = NO_PIECES
+        pieces[1][:] = NO_PIECES
+        squares = self.squares
+        squares[:] = EMPTY_SQUARES
+        table = self.zobristTable
+        pst = self.pst
+        occupancy = [0, 0]
+        material = [0, 0]
+        positional = [0, 0]
+        key = 0
+
+        flip = 0 if self.playerColor == WHITE else 56
+        sq = 0          # index in FEN order, a8 first
+        row_end = 8
+        for char in fields[0]:
+            code = FEN_CODES.get(char)
+            if code is not None:
+                if sq >= row_end:
+                    raise ValueError(f'invalid FEN: {fen!r}')
+                board_sq = sq ^ flip
+                color, piece_type = code >> 3, code & 7
+                bit = SQUARE_BB[board_sq]
+                pieces[color][piece_type] |= bit
+                occupancy[color] |= bit
+                squares[board_sq] = code
+                key ^= table[code][board_sq]
+                material[color] += PIECE_WEIGHTS[piece_type]
+                positional[color] += pst[color][piece_type][board_sq]
+                sq += 1
+            elif char == '/':
+                if sq != row_end or row_end == 64:
+                    raise ValueError(f'invalid FEN: {fen!r}')
+                row_end += 8
+            elif '1' <= char <= '8':
+                sq += int(char)
+            else:
+                raise ValueError(f'invalid FEN: {fen!r}')
+
+        if sq != 64 or row_end != 64:
+            raise ValueError(f'invalid FEN: {fen!r}')
+        if pieces[0][KING].bit_count() != 1 or pieces[1][KING].bit_count() != 1:
+            raise ValueError(f'invalid FEN, one king per side expected: {fen!r}')
+
+        self.turnColor = BLACK if len(fields) > 1 and fields[1] == 'b' else WHITE
+        self.playerTurn = self.turnColor == self.playerColor
+        if self.turnColor == BLACK:
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        self.halfmove = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmove = int(fields[5]) if len(fields) > 5 else 1
+
+        self.occupancy = occupancy
+        self.whiteScore, self.blackScore = material
+        self.whitePst, self.blackPst = positional
+        self.zobrist = key
+        self.whiteKing = SQUARE_COORDS[pieces[0][KING].bit_length() - 1]
+        self.blackKing = SQUARE_COORDS[pieces[1][KING].bit_length() - 1]
+
+        # pawns on their start row may still double push
+        unmoved = 0
+        for color in range(2):
+            if self.pawnDir[color] == UP:
+                home, pawn_row = ROW_BB[7], ROW_BB[6]
+            else:
+                home, pawn_row = ROW_BB[0], ROW_BB[1]
+            unmoved |= (pieces[color][PAWN] & pawn_row) | (occupancy[color] & ~pieces[color][PAWN] & home)
+        self.unmoved = unmoved
+
+        self.overState = None
+        self.ply = 0
+        self.history_board.clear()
+        self.repetitions.clear()
+
+
+    @classmethod
+    def from_fen(cls, fen, playerColor=WHITE):
+        board = cls(playerColor)
+        board.set_fen(fen)
+        return board
+
+
+    @classmethod
+    def load_fens(cls, lines, playerColor=WHITE):
+        # yields the same board for every FEN line, loaded in place: copy() what must outlive the loop
+        board = cls(playerColor)
+        for line in lines:
+            if line.strip():
+                board.set_fen(line)
+                yield board
+
+
+    def fen(self):
+        flip = 0 if self.playerColor == WHITE else 56
+        squares = self.squares
+        rows = []
+        for row in range(8):
+            text = ''
+            empty = 0
+            for x in range(8):
+                code = squares[(row * 8 + x) ^ flip]
+                if code is None:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += FEN_LETTERS[code]
+            if empty:
+                text += str(empty)
+            rows.append(text)
+
+        # no castling or en passant in these rules
+        turn = 'w' if self.turnColor == WHITE else 'b'
+        return f'{"/".join(rows)} {turn} - - {self.halfmove} {self.fullmove}'
+
+
+    def square_name(self, sq):
+        rank = 8 - (sq >> 3) if self.playerColor == WHITE else (sq >> 3) + 1
+        return FILES[sq & 7] + str(rank)
+
+
+    def parse_square(self, name):
+        if len(name) != 2 or name[0] not in FILES or name[1] not in '12345678':
+            raise ValueError(f'invalid square: {name!r}')
+
+        y = 8 - int(name[1]) if self.playerColor == WHITE else int(name[1]) - 1
+        return y * 8 + FILES.index(name[0])
+
+
+    def move_to_uci(self, move):
+        src, dest = square(move[0]), square(move[1])
+        text = self.square_name(src) + self.square_name(dest)
+        code = self.squares[src]
+        if code is not None and code & 7 == PAWN and SQUARE_BB[dest] & self.promotionRow[code >> 3]:
+            text += 'q'
+
+        return text
+
+
+    def parse_uci(self, text):
+        # long algebraic ('e2e4', 'e7e8q') to ((x, y), (x, y)); only queen promotions exist
+        if len(text) not in (4, 5) or (len(text) == 5 and text[4] != 'q'):
+            raise ValueError(f'invalid move: {text!r}')
+
+        return SQUARE_COORDS[self.parse_square(text[:2])], SQUARE_COORDS[self.parse_square(text[2:4])]
+
+
+    def move_to_san(self, move):
+        src, dest = square(move[0]), square(move[1])
+        code = self.squares[src]
+        color, piece_type = code >> 3, code & 7
+        capture = 'x' if self.squares[dest] is not None else ''
+
+        if piece_type == PAWN:
+            text = (FILES[src & 7] + capture if capture else '') + self.square_name(dest)
+            if SQUARE_BB[dest] & self.promotionRow[color]:
+                text += '=Q'
+        else:
+            # same kind of piece reaching dest too: name the file, else the rank, else both
+            rivals = [other for other, _ in self._legal_moves(color, SQUARE_BB[dest])
+                      if other != src and self.squares[other] == code]
+            text = FEN_PIECES[piece_type].upper()
+            if rivals:
+                if all(other & 7 != src & 7 for other in rivals):
+                    text += FILES[src & 7]
+                elif all(other >> 3 != src >> 3 for other in rivals):
+                    text += self.square_name(src)[1]
+                else:
+                    text += self.square_name(src)
+            text += capture + self.square_name(dest)
+
+        self.make_move(move[0], move[1])
+        if self._king_attacked(color ^ 1):
+            text += '#' if self.gameover else '+'
+        self.unmake_move()
+
+        return text
+
+
+    def parse_san(self, text):
+        # SAN ('Nf3', 'exd5', 'e8=Q+') to ((x, y), (x, y)); the repetition rule is not applied
+        match = SAN_PATTERN.match(text.rstrip('+#!?'))
+        if match is None:
+            if text.startswith(('O-O', '0-0')):
+                raise ValueError(f'castling is not part of these rules: {text!r}')
+            raise ValueError(f'invalid move: {text!r}')
+
+        letter, from_file, from_rank, dest_name, promotion = match.groups()
+        if promotion is not None and (letter or promotion[-1].upper() != 'Q'):
+            raise ValueError(f'only pawns promote, and only to a queen: {text!r}')
+
+        piece_type = FEN_PIECES.index(letter.lower()) if letter else PAWN
+        dest = self.parse_square(dest_name)
+        color = color_index(self.turnColor)
+        candidates = [src for src, _ in self._legal_moves(color, SQUARE_BB[dest])
+                      if self.squares[src] & 7 == piece_type
+                      and (from_file is None or FILES[src & 7] == from_file)
+                      and (from_rank is None or self.square_name(src)[1] == from_rank)]
+        if len(candidates) != 1:
+            raise ValueError(f'{"ambiguous" if candidates else "illegal"} move: {text!r}')
+
+        return SQUARE_COORDS[candidates[0]], SQUARE_COORDS[dest]
+
+
+    @property
+    def tiles(self):
+        # read-only 8x8 view of Piece objects for the UI and the console game
+        tiles = []
+        for y in range(8):
+            row = []
+            for x in range(8):
+                code = self.squares[y * 8 + x]
+                if code is None:
+                    row.append(None)
+                    continue
+
+                piece = PIECE_CLASSES[code & 7](x, y, COLORS[code >> 3])
+                piece.firstMove = bool(self.unmoved & SQUARE_BB[y * 8 + x])
+                row.append(piece)
+            tiles.append(row)
+
+        return tiles
+
+
+    def _do_move(self, src, dest):
+        # moves the bitboards only, returns the captured code for _undo_move
+        squares = self.squares
+        code = squares[src]
+        captured = squares[dest]
+        color = code >> 3
+        piece_type = code & 7
+        src_bit = SQUARE_BB[src]
+        dest_bit = SQUARE_BB[dest]
+
+        if captured is not None:
+            self.pieces[captured >> 3][captured & 7] ^= dest_bit
+            self.occupancy[captured >> 3] ^= dest_bit
+
+        self.pieces[color][piece_type] ^= src_bit
+        if piece_type == PAWN and dest_bit & self.promotionRow[color]:
+            piece_type = QUEEN
+        self.pieces[color][piece_type] ^= dest_bit
+        self.occupancy[color] ^= src_bit | dest_bit
+
+        squares[src] = None
+        squares[dest] = (color << 3) | piece_type
+
+        return captured
+
+
+    def _undo_move(self, src, dest, code, captured):
+        squares = self.squares
+        color = code >> 3
+        src_bit = SQUARE_BB[src]
+        dest_bit = SQUARE_BB[dest]
+
+        self.pieces[color][squares[dest] & 7] ^= dest_bit
+        self.pieces[color][code & 7] ^= src_bit
+        self.occupancy[color] ^= src_bit | dest_bit
+
+        if captured is not None:
+            self.pieces[captured >> 3][captured & 7] ^= dest_bit
+            self.occupancy[captured >> 3] ^= dest_bit
+
+        squares[src] = code
+        squares[dest] = captured
+
+
     def make_move(self, src, dest):         # src co dang x, y
-        src_piece = self.tiles[src[1]][src[0]]
-        dest_piece = self.tiles[dest[1]][dest[0]]
-
-        previous_state = {
-            "blackScore": self.blackScore,
-            "whiteScore": self.whiteScore,
-            "blackKing": self.blackKing,
-            "whiteKing": self.whiteKing,
-            "gameover": self.gameover,
-            "src": (src, src_piece.copy()),
-            "dest": (dest, dest_piece.copy() if dest_piece is not None else None)
-        }
-
-        self.history.append(previous_state)
-
-        if dest_piece is not None:
-            if self.turnColor == WHITE:
-                self.blackScore -= dest_piece.weight
+        src_sq = square(src)
+        dest_sq = square(dest)
+
+        if self.ply == len(self.history):
+            self.history.append(MoveRecord())
+        record = self.history[self.ply]
+        self.ply += 1
+
+        code = self.squares[src_sq]
+        record.src = src_sq
+        record.dest = dest_sq
+        record.code = code
+        record.whiteScore = self.whiteScore
+        record.blackScore = self.blackScore
+        record.whitePst = self.whitePst
+        record.blackPst = self.blackPst
+        record.whiteKing = self.whiteKing
+        record.blackKing = self.blackKing
+        record.unmoved = self.unmoved
+        record.overState = self.overState
+        record.zobrist = self.zobrist
+        record.halfmove = self.halfmove
+
+        captured = record.captured = self._do_move(src_sq, dest_sq)
+
+        table = self.zobristTable
+        key = self.zobrist ^ ZOBRIST_BLACK_TO_MOVE ^ table[code][src_sq] ^ table[self.squares[dest_sq]][dest_sq]
+        if captured is not None:
+            key ^= table[captured][dest_sq]
+        self.zobrist = key
+
+        if captured is not None:
+            if captured >> 3 == 1:
+                self.blackScore -= PIECE_WEIGHTS[captured & 7]
+                self.blackPst -= self.pst[1][captured & 7][dest_sq]
+            else:
+                self.whiteScore -= PIECE_WEIGHTS[captured & 7]
+                self.whitePst -= self.pst[0][captured & 7][dest_sq]
+
+        pst = self.pst[code >> 3]
+        if code >> 3 == 0:
+            self.whitePst += pst[self.squares[dest_sq] & 7][dest_sq] - pst[code & 7][src_sq]
+        else:
+            self.blackPst += pst[self.squares[dest_sq] & 7][dest_sq] - pst[code & 7][src_sq]
+
+        if code != self.squares[dest_sq]:
+            # promoted pawn, material follows the new queen
+            if code >> 3 == 0:
+                self.whiteScore += PIECE_WEIGHTS[QUEEN] - PIECE_WEIGHTS[PAWN]
             else:
-                self.whiteScore -= dest_piece.weight
-
-
-        src_piece.move(dest[0], dest[1])
-        dest_piece = src_piece
-        dest_piece.firstMove = False
-        
-        # replace piece in tiles
-        self.tiles[dest[1]][dest[0]] = dest_piece
-        self.tiles[src[1]][src[0]] = None
-        
-        if type(dest_piece) is Pawn:
-            if (self.playerTurn and dest[1] == 0) or (not self.playerTurn and dest[1] == 7):
-                self.tiles[dest[1]][dest[0]] = Queen(dest[0], dest[1], dest_piece.color)
-
-        if type(dest_piece) is King:
-            if dest_piece.color == WHITE:
-                self.whiteKing = (dest[0], dest[1])
+                self.blackScore += PIECE_WEIGHTS[QUEEN] - PIECE_WEIGHTS[PAWN]
+
+        if code & 7 == KING:
+            if code >> 3 == 0:
+                self.whiteKing = SQUARE_COORDS[dest_sq]
             else:
-                self.blackKing = (dest[0], dest[1])
+                self.blackKing = SQUARE_COORDS[dest_sq]
 
-        src_piece = None
+        self.unmoved &= ~(SQUARE_BB[src_sq] | SQUARE_BB[dest_sq])
+        self.halfmove = 0 if captured is not None or code & 7 == PAWN else self.halfmove + 1
+        self.fullmove += code >> 3
+        self.overState = None
         self.next_turn()
-        # TODO: check win condition
-        self.get_over_state()
-
 
 
 
     def unmake_move(self):
-        previous_state = self.history.pop()
-        self.blackScore = previous_state['blackScore']
-        self.whiteScore = previous_state['whiteScore']
-        self.whiteKing = previous_state['whiteKing']
-        self.blackKing = previous_state['blackKing']
-        self.gameover = previous_state['gameover']
-
-        x = previous_state['src'][0][0]
-        y = previous_state['src'][0][1]
-        self.tiles[y][x] = previous_state['src'][1]
-        x = previous_state['dest'][0][0]
-        y = previous_state['dest'][0][1]
-        self.tiles[y][x] = previous_state['dest'][1]
+        self.ply -= 1
+        record = self.history[self.ply]
+        self.blackScore = record.blackScore
+        self.whiteScore = record.whiteScore
+        self.whitePst = record.whitePst
+        self.blackPst = record.blackPst
+        self.whiteKing = record.whiteKing
+        self.blackKing = record.blackKing
+        self.overState = record.overState
+        self.zobrist = record.zobrist
+        self.unmoved = record.unmoved
+        self.halfmove = record.halfmove
+        self.fullmove -= record.code >> 3
+
+        self._undo_move(record.src, record.dest, record.code, record.captured)
 
         self.next_turn()
-        del previous_state
-    
+
 
 
     def next_turn(self):
@@ -146,198 +513,259 @@ class Board:
     def valid_move(self, coor, color):
         if self.is_valid_coords(coor) and (not self.piece_at_coords(coor) or self.enemy_at_coords(coor, color)):
             return True
-        
+
         return False
 
 
     def piece_at_coords(self, coords):
-        if not self.is_valid_coords(coords) or self.tiles[coords[1]][coords[0]] is None:
+        if not self.is_valid_coords(coords) or self.squares[square(coords)] is None:
             return False
-        
+
         return True
 
 
     def enemy_at_coords(self, coords, color):
-        if self.piece_at_coords(coords) and color != self.tiles[coords[1]][coords[0]].color:
+        if self.piece_at_coords(coords) and color_index(color) != self.squares[square(coords)] >> 3:
             return True
-        
+
         return False
-    
+
 
     def sort_by_weight(self, move):
-        if self.tiles[move[1][1]][move[1][0]] is None:
+        code = self.squares[square(move[1])]
+        if code is None:
             return -1
-        
-        return self.tiles[move[1][1]][move[1][0]].weight
+
+        return PIECE_WEIGHTS[code & 7]
+
+
+    def targets(self, sq):
+        # pseudo-legal destination mask of the piece standing on sq
+        code = self.squares[sq]
+        color = code >> 3
+        piece_type = code & 7
+        own = self.occupancy[color]
+
+        if piece_type == KNIGHT:
+            return KNIGHT_ATTACKS[sq] & ~own
+        if piece_type == KING:
+            return KING_ATTACKS[sq] & ~own
+
+        occ = self.occupancy[0] | self.occupancy[1]
+        if piece_type == ROOK:
+            return rook_attacks(sq, occ) & ~own
+        if piece_type == BISHOP:
+            return bishop_attacks(sq, occ) & ~own
+        if piece_type == QUEEN:
+            return queen_attacks(sq, occ) & ~own
+
+        # pawn: pushes onto empty squares, captures on the diagonals
+        direction = self.pawnDir[color]
+        moves = PAWN_ATTACKS[direction][sq] & self.occupancy[color ^ 1]
+        step = -8 if direction == UP else 8
+        if 0 <= sq + step < 64 and not occ & SQUARE_BB[sq + step]:
+            moves |= SQUARE_BB[sq + step]
+            if self.unmoved & SQUARE_BB[sq] and 0 <= sq + 2 * step < 64 and not occ & SQUARE_BB[sq + 2 * step]:
+                moves |= SQUARE_BB[sq + 2 * step]
+
+        return moves
 
 
+    def valid_moves_at(self, coords):
+        if self.squares[square(coords)] is None:
+            return []
+
+        return [SQUARE_COORDS[dest] for dest in iter_bits(self.targets(square(coords)))]
+
+
+    def attackers_to(self, sq, color, occ):
+        # reverse attack query: pieces of color (index) hitting sq given occupancy occ
+        pieces = self.pieces[color]
+        return ((KNIGHT_ATTACKS[sq] & pieces[KNIGHT])
+                | (KING_ATTACKS[sq] & pieces[KING])
+                | (PAWN_ATTACKS[self.pawnDir[color ^ 1]][sq] & pieces[PAWN])
+                | (rook_attacks(sq, occ) & (pieces[ROOK] | pieces[QUEEN]))
+                | (bishop_attacks(sq, occ) & (pieces[BISHOP] | pieces[QUEEN])))
+
+
+    def _king_attacked(self, color):
+        king = self.pieces[color][KING]
+        if not king:
+            return False
+
+        return bool(self.attackers_to(king.bit_length() - 1, color ^ 1, self.occupancy[0] | self.occupancy[1]))
+
+
+    def _legal_moves(self, color, mask=FULL):
+        # one pass legal generation from check and pin masks, no make/test/undo;
+        # only destinations inside mask are generated
+        them = color ^ 1
+        own = self.occupancy[color]
+        enemy = self.occupancy[them]
+        occ = own | enemy
+        king = self.pieces[color][KING]
+        king_sq = king.bit_length() - 1
+        checkers = self.attackers_to(king_sq, them, occ)
+
+        # the king may not step onto an attacked square, nor slide along the checking ray
+        occ_without_king = occ ^ king
+        for dest in iter_bits(KING_ATTACKS[king_sq] & ~own & mask):
+            if not self.attackers_to(dest, them, occ_without_king):
+                yield king_sq, dest
+
+        if checkers & (checkers - 1):
+            return          # double check, only the king can move
+
+        check_mask = mask
+        if checkers:
+            check_mask &= BETWEEN[king_sq][checkers.bit_length() - 1] | checkers
+
+        # a piece is pinned when it is the only blocker between our king and an enemy slider
+        pieces = self.pieces[them]
+        snipers = ((rook_attacks(king_sq, enemy) & (pieces[ROOK] | pieces[QUEEN]))
+                   | (bishop_attacks(king_sq, enemy) & (pieces[BISHOP] | pieces[QUEEN])))
+        pinned = 0
+        for sniper in iter_bits(snipers):
+            blockers = BETWEEN[king_sq][sniper] & occ
+            if blockers and not blockers & (blockers - 1):
+                pinned |= blockers & own
+
+        for src in iter_bits(own ^ king):
+            targets = self.targets(src) & check_mask
+            if pinned & SQUARE_BB[src]:
+                targets &= LINE[king_sq][src]
+
+            for dest in iter_bits(targets):
+                yield src, dest
 
 
     def get_moves(self):        # [(src, dest), ...]
         moves = []
-        enemy_king = self.blackKing if self.turnColor == WHITE else self.whiteKing
+        out_of_move = True
 
-        for y in range(8):
-            for x in range(8):
-                if self.piece_at_coords((x, y)) and self.turnColor == self.tiles[y][x].color:
-                    for move in self.tiles[y][x].valid_moves(self):
-                        if not self.checked_after_move((x,y), move, self.turnColor):
-                            tmp_board = self.copy()
-                            tmp_board.tiles[move[1]][move[0]] = self.tiles[y][x]
-                            tmp_board.tiles[y][x] = None
-                            if tmp_board not in self.history_board:
-                                moves.append(((x, y), move))
-                                del tmp_board
+        for src, dest in self._legal_moves(color_index(self.turnColor)):
+            out_of_move = False
+            if self.repetitions and self.zobrist_after(src, dest) in self.repetitions:
+                continue
+
+            moves.append((SQUARE_COORDS[src], SQUARE_COORDS[dest]))
+
+        if self.overState is None:
+            self.set_over_state(out_of_move)
 
         moves = sorted(moves, key=self.sort_by_weight, reverse=True)
         return moves
-    
+
+
+
+    def get_captures(self):     # captures and promotions only, best victim first
+        color = color_index(self.turnColor)
+        squares = self.squares
+        scored = []
+
+        for src, dest in self._legal_moves(color, self.occupancy[color ^ 1] | self.promotionRow[color]):
+            victim = squares[dest]
+            attacker = squares[src] & 7
+            if victim is not None:
+                score = MVV_LVA[victim & 7][attacker]
+            elif attacker == PAWN:
+                score = MVV_LVA[QUEEN][PAWN]
+            else:
+                continue
+            scored.append((score, src, dest))
+
+        scored.sort(reverse=True)
+        return [(SQUARE_COORDS[src], SQUARE_COORDS[dest]) for _, src, dest in scored]
+
 
 
     def is_valid_coords(self, coords):
         if coords[0] < 0 or coords[0] >= 8 or coords[1] < 0 or coords[1] >= 8:
             return False
-        
+
         return True
-    
+
 
 
     def checked_after_move(self, src, dest, color):
-        res = False
-        # self.make_move(src, dest)
-        src_piece = self.tiles[src[1]][src[0]]
-        dest_piece = self.tiles[dest[1]][dest[0]]
-        tmp_dest = dest_piece.copy() if dest_piece is not None else None
-        tmp_src = src_piece.copy()
-
-
-        if type(dest_piece) is Pawn:
-            if (self.playerTurn and dest[1] == 0) or (not self.playerTurn and dest[1] == 7):
-                src_piece = Queen(src[0], src[1], src_piece.color)
-
-        src_piece.move(dest[0], dest[1])
-        dest_piece = src_piece
-
-        self.tiles[src[1]][src[0]] = None
-        self.tiles[dest[1]][dest[0]] = dest_piece
-        
-        if type(dest_piece) is Pawn:
-            if (self.playerTurn and dest[1] == 0) or (not self.playerTurn and dest[1] == 7):
-                self.tiles[dest[1]][dest[0]] = Queen(dest[0], dest[1], dest_piece.color)
-
-        king = None
-        if type(dest_piece) is King:
-            if dest_piece.color == WHITE:
-                king = self.whiteKing
-                self.whiteKing = (dest[0], dest[1])
-            else:
-                king = self.blackKing
-                self.blackKing = (dest[0], dest[1])
-        src_piece = None
-        self.next_turn()
+        src_sq = square(src)
+        dest_sq = square(dest)
+
+        code = self.squares[src_sq]
+        captured = self._do_move(src_sq, dest_sq)
+        res = self._king_attacked(color_index(color))
+        self._undo_move(src_sq, dest_sq, code, captured)
 
-        if self.is_checked(color):
-            res = True
+        return res
 
-        # restore tiles
 
-        self.tiles[src[1]][src[0]] = tmp_src
-        self.tiles[dest[1]][dest[0]] = tmp_dest
-        # self.tiles[src[1]][src[0]].move(src[0], src[1])
+    def is_checked(self, color):
+        return self._king_attacked(color_index(color))
 
-        if type(dest_piece) is King:
-            if dest_piece.color == WHITE:
-                self.whiteKing = king
-            else:
-                self.blackKing = king
 
-        self.next_turn() 
-        # self.unmake_move()
-        return res
+    @property
+    def gameover(self):
+        if self.overState is None:
+            self.get_over_state()
 
+        return self.overState[0]
+
+
+    @property
+    def game_result(self):
+        if self.overState is None:
+            self.get_over_state()
+
+        return self.overState[1]
 
-    def is_checked(self, color):
-        king_coords = self.whiteKing if color == WHITE else self.blackKing
-        
-        for y in range(8):
-            for x in range(8):
-                if self.enemy_at_coords((x,y), color):
-                    for move in self.tiles[y][x].valid_moves(self):
-                        if king_coords[0] == move[0] and king_coords[1] == move[1]:
-                            return True
-                        
-        return False
-    
 
     def get_over_state(self):
         out_of_move = True
-        
-        for y in range(8):
-            for x in range(8):
-                if self.piece_at_coords((x, y)) and self.turnColor == self.tiles[y][x].color:
-                    moves = self.tiles[y][x].valid_moves(self)
-                    for move in moves:
-                        if not self.checked_after_move((x, y), move, self.turnColor):
-                            out_of_move = False
-                            break
-            
-            if not out_of_move:
-                break
-                        
-
-        if out_of_move:
-            self.gameover = True
-            if not self.is_checked(self.turnColor):
-                self.game_result = (None, 'draw')
-                return
-            
-            else:
-                self.game_result = (self.turnColor, 'lose')
-                return 
-        
-        self.gameover = False
-        return None
-    
+        for _ in self._legal_moves(color_index(self.turnColor)):
+            out_of_move = False
+            break
+
+        self.set_over_state(out_of_move)
+
+
+    def set_over_state(self, out_of_move):
+        # cached until the next make_move, unmake_move restores the previous one
+        if not out_of_move:
+            self.overState = (False, None)
+        elif self.is_checked(self.turnColor):
+            self.overState = (True, (self.turnColor, 'lose'))
+        else:
+            self.overState = (True, (None, 'draw'))
+
 
     def copy(self):
-        copy = Board(self.playerColor)
-        for y in range(8):
-            for x in range(8):
-                if self.tiles[y][x] is not None:
-                    copy.tiles[y][x] = self.tiles[y][x].copy()
-                else:
-                    copy.tiles[y][x] = None
+        copy = Board.__new__(Board)
+        copy.__dict__.update(self.__dict__)
+        copy.history = []
+        copy.ply = 0
+        copy.history_board = self.history_board[:]
+        copy.repetitions = dict(self.repetitions)
+        copy.pieces = [self.pieces[0][:], self.pieces[1][:]]
+        copy.occupancy = self.occupancy[:]
+        copy.squares = self.squares[:]
 
         return copy
-    
+
 
     def __eq__(self, value: object) -> bool:
-        for y in range(8):
-            for x in range(8):
-                if type(self.tiles[y][x]) != type(value.tiles[y][x]):
-                    return False
-                
-        return True
+        return self.squares == value.squares
+
 
-                        
 
     def visualize_board(self):
         for y in range(8):
             row = []
             for x in range(8):
-                if self.tiles[y][x] is None:
+                code = self.squares[y * 8 + x]
+                if code is None:
                     row.append(None)
                 else:
-                    color = self.tiles[y][x].color
-                    if color == WHITE:
-                        color = 'w_'
-                    else:
-                        color = 'b_'
-                    row.append(color + type(self.tiles[y][x]).__name__)
-            
-            print(row)
+                    color = 'w_' if code >> 3 == 0 else 'b_'
+                    row.append(color + PIECE_CLASSES[code & 7].__name__)
 
-
-
-
-        
\ No newline at end of file
+            print(row)
@@ -0,0 +1,76 @@
+from Board import color_index
+from Piece import MVV_LVA
+from bitboard import PAWN, QUEEN, SQUARE_BB
+
+MAX_PLY = 128           # deepest ply the search reaches, sizes the killer and pv tables
+
+# score bands: captures/promotions, then killers, then quiet moves by history
+CAPTURE_SCORE = 1 << 30
+KILLER_SCORES = (1 << 29, (1 << 29) - 1)
+HISTORY_LIMIT = 1 << 28
+
+
+class MoveOrdering:
+
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [[0] * 4096, [0] * 4096]     # [color][src * 64 + dest]
+
+
+    def new_search(self):
+        # killers belong to the old root, history is only faded
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        for table in self.history:
+            for i in range(4096):
+                table[i] >>= 1
+
+
+    def order(self, board, moves, ply):
+        squares = board.squares
+        color = color_index(board.turnColor)
+        promotion_row = board.promotionRow[color]
+        history = self.history[color]
+        killer_1, killer_2 = self.killers[ply]
+
+        def score(move):
+            src = move[0][1] * 8 + move[0][0]
+            dest = move[1][1] * 8 + move[1][0]
+            victim = squares[dest]
+            attacker = squares[src] & 7
+            promotion = attacker == PAWN and SQUARE_BB[dest] & promotion_row
+
+            if victim is not None or promotion:
+                value = CAPTURE_SCORE
+                if victim is not None:
+                    value += MVV_LVA[victim & 7][attacker]
+                if promotion:
+                    value += MVV_LVA[QUEEN][PAWN]
+                return value
+            if move == killer_1:
+                return KILLER_SCORES[0]
+            if move == killer_2:
+                return KILLER_SCORES[1]
+
+            return history[src * 64 + dest]
+
+        return sorted(moves, key=score, reverse=True)
+
+
+    def cutoff(self, board, move, depth, ply):
+        # called with the move that failed high, before anything else is made on board
+        src = move[0][1] * 8 + move[0][0]
+        dest = move[1][1] * 8 + move[1][0]
+        if board.squares[dest] is not None:
+            return              # captures are ordered well enough by MVV-LVA
+
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        history = self.history[color_index(board.turnColor)]
+        history[src * 64 + dest] += depth * depth
+        if history[src * 64 + dest] >= HISTORY_LIMIT:
+            for i in range(4096):
+                history[i] >>= 1
@@ -1,6 +1,4 @@
-import os
 from config import *
-import pygame
 
 # king_black = pygame.image.load(os.path.join('images', 'king-black.png'))
 # queen_black = pygame.image.load(os.path.join('images', 'queen-black.png'))
@@ -57,6 +55,11 @@ class Piece:
         self.y = y
 
 
+    def valid_moves(self, board):
+        # move generation lives in the board's bitboards, pieces are only a view of it
+        return board.valid_moves_at((self.x, self.y))
+
+
     def copy(self):
         copy = type(self)(self.x, self.y, self.color)
         copy.image = self.image
@@ -71,19 +74,6 @@ class King(Piece):
         super().__init__(x, y, color)
         self.image = 0
         self.weight = 1000
-
-    
-    def valid_moves(self, board):
-        moves = []
-        for x in range(self.x - 1, self.x + 2):
-            for y in range(self.y - 1, self.y + 2):
-                if board.valid_move((x, y), self.color):
-                    moves.append((x, y))
-
-        # castle
-        
-
-        return moves
     
 
 class Queen(Piece):
@@ -93,13 +83,6 @@ class Queen(Piece):
         self.image = 2
         self.weight = 90
 
-    
-    def valid_moves(self, board):
-        moves = Rook.valid_moves(self, board) + Bishop.valid_moves(self, board)
-
-        return moves
-
-
 
 class Bishop(Piece):
 
@@ -107,47 +90,6 @@ class Bishop(Piece):
         super().__init__(x, y, color)
         self.image = 4
         self.weight = 30
-
-    
-    def valid_moves(self, board):
-        moves = []
-        x, y = self.x, self.y
-        while board.valid_move((x - 1, y - 1), self.color):
-            moves.append((x - 1, y - 1))
-            if board.piece_at_coords((x - 1, y - 1)):
-                break
-
-            x -= 1
-            y -= 1
-
-        x, y = self.x, self.y
-        while board.valid_move((x + 1, y - 1), self.color):
-            moves.append((x + 1, y - 1))
-            if board.piece_at_coords((x + 1, y - 1)):
-                break
-
-            x += 1
-            y -= 1
-
-        x, y = self.x, self.y
-        while board.valid_move((x - 1, y + 1), self.color):
-            moves.append((x - 1, y + 1))
-            if board.piece_at_coords((x - 1, y + 1)):
-                break
-
-            x -= 1
-            y += 1
-        
-        x, y = self.x, self.y
-        while board.valid_move((x + 1, y + 1), self.color):
-            moves.append((x + 1, y + 1))
-            if board.piece_at_coords((x + 1, y + 1)):
-                break
-
-            x += 1
-            y += 1
-
-        return moves
     
 
 class Knight(Piece):
@@ -156,27 +98,6 @@ class Knight(Piece):
         super().__init__(x, y, color)
         self.image = 6
         self.weight = 30
-
-    
-    def valid_moves(self, board):
-        moves = []
-        # x = 6;  y = 7
-        # up right
-        coor1 = (self.x + 1, self.y - 2)
-        coor2 = (self.x + 2, self.y - 1)
-        coor3 = (self.x + 1, self.y + 2)
-        coor4 = (self.x + 2, self.y + 1)
-        coor5 = (self.x - 1, self.y + 2)
-        coor6 = (self.x - 2, self.y + 1)
-        coor7 = (self.x - 1, self.y - 2)
-        coor8 = (self.x - 2, self.y - 1)
-        coors = [coor1, coor2, coor3, coor4, coor5, coor6, coor7, coor8]
-        
-        for coor in coors:
-            if board.valid_move(coor, self.color):    
-                moves.append(coor)
-
-        return moves
     
 
 class Rook(Piece):
@@ -185,36 +106,6 @@ class Rook(Piece):
         super().__init__(x, y, color)
         self.image = 8
         self.weight = 50
-
-    
-    def valid_moves(self, board):
-        moves = []
-
-        for y in range(self.y - 1, -1, -1):
-            if board.valid_move((self.x, y), self.color):
-                moves.append((self.x, y))
-            if board.piece_at_coords((self.x, y)):
-                break
-
-        for y in range(self.y + 1, 8):
-            if board.valid_move((self.x, y), self.color):
-                moves.append((self.x, y))
-            if board.piece_at_coords((self.x, y)):
-                break
-
-        for x in range(self.x - 1, -1, -1):
-            if board.valid_move((x, self.y), self.color):
-                moves.append((x, self.y))
-            if board.piece_at_coords((x, self.y)):
-                break
-
-        for x in range(self.x + 1, 8):
-            if board.valid_move((x, self.y), self.color):
-                moves.append((x, self.y))
-            if board.piece_at_coords((x, self.y)):
-                break
-
-        return moves
     
 
 class Pawn(Piece):
@@ -224,37 +115,64 @@ class Pawn(Piece):
         self.image = 10
         self.weight = 10
 
-    
-    def valid_moves(self, board):
-        moves = []
-
-        if board.playerTurn:
-            if board.valid_move((self.x, self.y - 1), self.color) and not board.piece_at_coords((self.x, self.y - 1)):
-                moves.append((self.x, self.y - 1))
-
-                if board.valid_move((self.x, self.y - 2), self.color) and not board.piece_at_coords((self.x, self.y - 2)) and self.firstMove:
-                    moves.append((self.x, self.y - 2))
-
-            # capture
-            if board.valid_move((self.x - 1, self.y - 1), self.color) and board.enemy_at_coords((self.x - 1, self.y - 1), self.color):
-                moves.append((self.x - 1, self.y - 1))
-
-            if board.valid_move((self.x + 1, self.y - 1), self.color) and board.enemy_at_coords((self.x + 1, self.y - 1), self.color):
-                moves.append((self.x + 1, self.y - 1))
-
-        else:
-
-            if board.valid_move((self.x, self.y + 1), self.color) and not board.piece_at_coords((self.x, self.y + 1)):
-                moves.append((self.x, self.y + 1))
-            
-                if board.valid_move((self.x, self.y + 2), self.color) and not board.piece_at_coords((self.x, self.y + 2)) and self.firstMove:
-                    moves.append((self.x, self.y + 2))
-            
-            if board.valid_move((self.x + 1, self.y + 1), self.color) and board.enemy_at_coords((self.x + 1, self.y + 1), self.color):
-                moves.append((self.x + 1, self.y + 1))
-
-            if board.valid_move((self.x - 1, self.y + 1), self.color) and board.enemy_at_coords((self.x - 1, self.y + 1), self.color):
-                moves.append((self.x - 1, self.y + 1))
-
 
-        return moves
+# indexed by the piece type constants of bitboard.py (image // 2)
+PIECE_CLASSES = (King, Queen, Bishop, Knight, Rook, Pawn)
+PIECE_WEIGHTS = tuple(cls(0, 0, WHITE).weight for cls in PIECE_CLASSES)
+
+# positional bonus in weight units, laid out for the side that pushes its pawns up
+# (row 0 is the far side); same order as PIECE_CLASSES
+PIECE_SQUARE_TABLES = (
+    (-3, -4, -4, -5, -5, -4, -4, -3,        # King
+     -3, -4, -4, -5, -5, -4, -4, -3,
+     -3, -4, -4, -5, -5, -4, -4, -3,
+     -3, -4, -4, -5, -5, -4, -4, -3,
+     -2, -3, -3, -4, -4, -3, -3, -2,
+     -1, -2, -2, -2, -2, -2, -2, -1,
+      2,  2,  0,  0,  0,  0,  2,  2,
+      2,  3,  1,  0,  0,  1,  3,  2),
+    (-2, -1, -1, -1, -1, -1, -1, -2,        # Queen
+     -1,  0,  0,  0,  0,  0,  0, -1,
+     -1,  0,  1,  1,  1,  1,  0, -1,
+     -1,  0,  1,  1,  1,  1,  0, -1,
+      0,  0,  1,  1,  1,  1,  0, -1,
+     -1,  1,  1,  1,  1,  1,  0, -1,
+     -1,  0,  1,  0,  0,  0,  0, -1,
+     -2, -1, -1, -1, -1, -1, -1, -2),
+    (-2, -1, -1, -1, -1, -1, -1, -2,        # Bishop
+     -1,  0,  0,  0,  0,  0,  0, -1,
+     -1,  0,  1,  1,  1,  1,  0, -1,
+     -1,  1,  1,  1,  1,  1,  1, -1,
+     -1,  0,  1,  1,  1,  1,  0, -1,
+     -1,  1,  1,  1,  1,  1,  1, -1,
+     -1,  1,  0,  0,  0,  0,  1, -1,
+     -2, -1, -1, -1, -1, -1, -1, -2),
+    (-5, -4, -3, -3, -3, -3, -4, -5,        # Knight
+     -4, -2,  0,  0,  0,  0, -2, -4,
+     -3,  0,  1,  2,  2,  1,  0, -3,
+     -3,  1,  2,  2,  2,  2,  1, -3,
+     -3,  0,  2,  2,  2,  2,  0, -3,
+     -3,  1,  1,  2,  2,  1,  1, -3,
+     -4, -2,  0,  1,  1,  0, -2, -4,
+     -5, -4, -3, -3, -3, -3, -4, -5),
+    ( 0,  0,  0,  0,  0,  0,  0,  0,        # Rook
+      1,  1,  1,  1,  1,  1,  1,  1,
+     -1,  0,  0,  0,  0,  0,  0, -1,
+     -1,  0,  0,  0,  0,  0,  0, -1,
+     -1,  0,  0,  0,  0,  0,  0, -1,
+     -1,  0,  0,  0,  0,  0,  0, -1,
+     -1,  0,  0,  0,  0,  0,  0, -1,
+      0,  0,  0,  1,  1,  0,  0,  0),
+    ( 0,  0,  0,  0,  0,  0,  0,  0,        # Pawn
+      5,  5,  5,  5,  5,  5,  5,  5,
+      1,  1,  2,  3,  3,  2,  1,  1,
+      1,  1,  1,  3,  3,  1,  1,  1,
+      0,  0,  0,  2,  2,  0,  0,  0,
+      1, -1, -1,  0,  0, -1, -1,  1,
+      1,  1,  1, -2, -2,  1,  1,  1,
+      0,  0,  0,  0,  0,  0,  0,  0),
+)
+
+# most valuable victim first, least valuable attacker breaks ties: MVV_LVA[victim][attacker]
+MVV_LVA = tuple(tuple(PIECE_WEIGHTS[victim] * 16 - PIECE_WEIGHTS[attacker] // 16 for attacker in range(6))
+                for victim in range(6))
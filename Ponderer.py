@@ -0,0 +1,65 @@
+import threading
+from core import SearchContext, iterative_deepening
+
+
+class Ponderer:
+    # searches the position after the opponent's expected reply on a background thread
+    # while they think. A hit turns that search into a timed one, a miss stops and drops it;
+    # the shared transposition table keeps whatever was found either way
+
+    def __init__(self, tt=None, tablebase=None):
+        self.tt = tt
+        self.tablebase = tablebase
+        self.thread = None
+        self.search = None
+        self.key = None
+        self.result = None
+
+
+    def start(self, board, move, max_depth):
+        # board is the position before the reply, it is copied and left untouched
+        self.stop()
+        if move not in board.get_moves():
+            return False
+
+        position = board.copy()
+        position.make_move(move[0], move[1])
+        position.push_history()
+
+        self.key = position.zobrist
+        self.result = None
+        self.search = SearchContext(self.tt, tablebase=self.tablebase)
+        self.thread = threading.Thread(target=self._run, args=(position, max_depth), daemon=True)
+        self.thread.start()
+        return True
+
+
+    def _run(self, position, max_depth):
+        self.result = iterative_deepening(position, max_depth, self.search)
+
+
+    def hit(self, board, time_ms):
+        # (best_move, score, search) when board is the pondered position, else None after
+        # stopping the ponder search
+        if self.thread is None:
+            return None
+        if board.zobrist != self.key:
+            self.stop()
+            return None
+
+        search = self.search
+        search.extend(time_ms)
+        self.thread.join()
+        self.thread = None
+        best_move, score = self.result
+        if best_move is None:
+            return None
+
+        return best_move, score, search
+
+
+    def stop(self):
+        if self.thread is not None:
+            self.search.stop.set()
+            self.thread.join()
+            self.thread = None
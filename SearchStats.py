@@ -0,0 +1,107 @@
+import json
+import time
+
+# methods timed per phase while the stats are attached, by the object they live on; the
+# check and pin masks of _legal_moves are movegen time, checks are the king tests outside it
+BOARD_PHASES = {
+    'get_moves': 'movegen',
+    'get_captures': 'movegen',
+    '_legal_moves': 'movegen',
+    '_king_attacked': 'checks',
+    'make_move': 'make_unmake',
+    'unmake_move': 'make_unmake',
+}
+ORDERING_PHASES = {'order': 'ordering'}
+TT_PHASES = {'probe': 'tt', 'store': 'tt'}
+
+
+class SearchStats:
+    # counters filled by minimax/quiescence plus call counts and time per phase. The timing
+    # wraps the methods of the searched board, tt and move ordering instances only while
+    # attached, so a search without stats runs the plain methods
+
+    def __init__(self):
+        self.patched = []
+        self.active = False         # inside a timed call, nested calls are counted, not timed
+        self.reset()
+
+
+    def reset(self):
+        self.evaluations = 0
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tablebase_hits = 0
+        self.calls = dict.fromkeys(list(BOARD_PHASES) + list(ORDERING_PHASES) + list(TT_PHASES), 0)
+        self.phase_time = dict.fromkeys(set(BOARD_PHASES.values()) | {'ordering', 'tt'}, 0.0)
+
+
+    def attach(self, board, search):
+        for name, phase in BOARD_PHASES.items():
+            self._wrap(board, name, phase)
+        if search.ordering is not None:
+            for name, phase in ORDERING_PHASES.items():
+                self._wrap(search.ordering, name, phase)
+        if search.tt is not None:
+            for name, phase in TT_PHASES.items():
+                self._wrap(search.tt, name, phase)
+
+
+    def detach(self):
+        # the instance attributes shadowed the class methods, dropping them restores those
+        for owner, name in self.patched:
+            delattr(owner, name)
+        self.patched = []
+
+
+    def _wrap(self, owner, name, phase):
+        method = getattr(owner, name)
+        calls = self.calls
+        phase_time = self.phase_time
+        perf_counter = time.perf_counter
+        stats = self
+
+        def timed(*args):
+            calls[name] += 1
+            if stats.active:
+                return method(*args)
+
+            stats.active = True
+            start = perf_counter()
+            try:
+                return method(*args)
+            finally:
+                phase_time[phase] += perf_counter() - start
+                stats.active = False
+
+        setattr(owner, name, timed)
+        self.patched.append((owner, name))
+
+
+    def as_dict(self, search):
+        elapsed = search.elapsed()
+        timed = sum(self.phase_time.values())
+        phase_ms = {phase: round(seconds * 1000, 3) for phase, seconds in sorted(self.phase_time.items())}
+        phase_ms['search'] = round((elapsed - timed) * 1000, 3)     # evaluation and minimax itself
+
+        result = {
+            'depth': search.depth,
+            'nodes': search.nodes,
+            'qnodes': self.qnodes,
+            'evaluations': self.evaluations,
+            'time_ms': round(elapsed * 1000, 3),
+            'nps': round(search.nodes / elapsed) if elapsed > 0 else 0,
+            'cutoffs': self.cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            'tablebase_hits': self.tablebase_hits,
+            'calls': dict(self.calls),
+            'phase_ms': phase_ms,
+        }
+        if search.tt is not None:
+            result['tt'] = search.tt.stats()
+
+        return result
+
+
+    def to_json(self, search):
+        return json.dumps(self.as_dict(search))
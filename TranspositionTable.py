@@ -0,0 +1,132 @@
+from array import array
+from bitboard import SQUARE_COORDS, square
+
+# bound types of a stored score
+EXACT, LOWER, UPPER = 1, 2, 3
+FLIPPED_BOUND = (0, EXACT, UPPER, LOWER)     # the same bound seen from the other side
+
+# replacement schemes
+ALWAYS = 'always'           # newest entry wins
+DEPTH = 'depth'             # deeper (or same search's) entry wins
+TWO_TIER = 'two_tier'       # depth-preferred slot plus an always-replace slot
+
+ENTRY_SIZE = 16             # bytes per entry: 8 for the key, 8 for the packed data
+
+# data layout, low to high bits: move (13) | bound (2) | depth (8) | age (6) | score (32)
+MOVE_BITS, BOUND_SHIFT, DEPTH_SHIFT, AGE_SHIFT, SCORE_SHIFT = 13, 13, 15, 23, 29
+SCORE_OFFSET = 1 << 31
+
+
+class TranspositionTable:
+
+    def __init__(self, size_mb=16, replacement=TWO_TIER):
+        if replacement not in (ALWAYS, DEPTH, TWO_TIER):
+            raise ValueError(f'unknown replacement scheme {replacement!r}')
+
+        # two slots per bucket, bucket count rounded down to a power of two
+        buckets = max(1, size_mb * 1024 * 1024 // (2 * ENTRY_SIZE))
+        buckets = 1 << (buckets.bit_length() - 1)
+
+        self.replacement = replacement
+        self.mask = buckets - 1
+        self.keys = array('Q', bytes(8 * 2 * buckets))
+        self.data = array('q', bytes(8 * 2 * buckets))
+        self.age = 0
+        self.reset_counters()
+
+
+    @property
+    def size_mb(self):
+        return len(self.keys) * ENTRY_SIZE / (1024 * 1024)
+
+
+    def reset_counters(self):
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+
+    def new_search(self):
+        # entries of older searches become first in line for replacement; the counters
+        # start over so stats() describes this search only
+        self.age = (self.age + 1) & 63
+        self.reset_counters()
+
+
+    def clear(self):
+        self.keys = array('Q', bytes(8 * len(self.keys)))
+        self.data = array('q', bytes(8 * len(self.data)))
+        self.age = 0
+
+
+    def probe(self, key):
+        # (depth, score, bound, move) or None, move is ((x, y), (x, y)) or None
+        self.probes += 1
+        slot = (key & self.mask) << 1
+        keys = self.keys
+
+        if keys[slot] != key:
+            slot += 1
+            if keys[slot] != key:
+                if keys[slot - 1] or keys[slot]:
+                    self.collisions += 1
+                return None
+
+        self.hits += 1
+        data = self.data[slot]
+        move = data & ((1 << MOVE_BITS) - 1)
+        if move:
+            move -= 1
+            move = (SQUARE_COORDS[move >> 6], SQUARE_COORDS[move & 63])
+        else:
+            move = None
+
+        return ((data >> DEPTH_SHIFT) & 255, (data >> SCORE_SHIFT) - SCORE_OFFSET,
+                (data >> BOUND_SHIFT) & 3, move)
+
+
+    def store(self, key, depth, score, bound, move):
+        slot = (key & self.mask) << 1
+        keys = self.keys
+        data = self.data
+
+        if self.replacement == TWO_TIER:
+            # the first slot keeps the deepest entry of the current search, everything
+            # else lands in the second one
+            if keys[slot] != key and keys[slot] and self._keep(data[slot], depth):
+                slot += 1
+        elif self.replacement == DEPTH:
+            if keys[slot] != key and keys[slot] and self._keep(data[slot], depth):
+                return
+        # ALWAYS: first slot, unconditionally
+
+        if keys[slot] and keys[slot] != key:
+            self.overwrites += 1
+        self.stores += 1
+
+        packed_move = 0
+        if move is not None:
+            packed_move = square(move[0]) * 64 + square(move[1]) + 1
+
+        keys[slot] = key
+        data[slot] = (((int(score) + SCORE_OFFSET) << SCORE_SHIFT) | (self.age << AGE_SHIFT)
+                      | (min(depth, 255) << DEPTH_SHIFT) | (bound << BOUND_SHIFT) | packed_move)
+
+
+    def _keep(self, old, depth):
+        return (old >> AGE_SHIFT) & 63 == self.age and (old >> DEPTH_SHIFT) & 255 > depth
+
+
+    def stats(self):
+        return {
+            'size_mb': self.size_mb,
+            'entries': len(self.keys),
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.probes if self.probes else 0.0,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+        }
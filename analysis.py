@@ -0,0 +1,111 @@
+"""Batch analysis: scores many positions over a process pool, streaming the results.
+
+    python analysis.py positions.fen [--depth N | --time-ms N] [--workers N] > results.jsonl
+
+Input is one FEN per line (or '-' for stdin), output one JSON object per line in
+completion order, each carrying the input index.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from Board import Board
+from config import *
+from core import SearchContext, iterative_deepening
+from TranspositionTable import TranspositionTable
+
+MAX_DEPTH = 64
+PENDING_PER_WORKER = 4      # futures in flight per worker, the bound on buffered input
+
+# per-process transposition table, reused by every position a worker analyses
+_tt = None
+
+
+def _init_worker(tt_mb):
+    global _tt
+    _tt = TranspositionTable(tt_mb)
+
+
+def analyze(fen, depth=None, time_ms=None, tt=None):
+    # best move, score (pawn = 10, side to move's view) and pv of one position
+    board = Board.from_fen(fen)
+    search = SearchContext(tt, time_ms=time_ms)
+    if depth is None:
+        depth = MAX_DEPTH if time_ms is not None else MEDIUM
+    best_move, score = iterative_deepening(board, depth, search)
+
+    pv = []
+    for move in search.best_pv:
+        pv.append(board.move_to_uci(move))
+        board.make_move(move[0], move[1])
+
+    return {
+        'fen': fen,
+        'best_move': pv[0] if pv else None,
+        'score': score,
+        'pv': pv,
+        'depth': search.depth,
+        'nodes': search.nodes,
+        'time_ms': round(search.elapsed() * 1000, 3),
+    }
+
+
+def _analyze_task(index, fen, depth, time_ms):
+    try:
+        result = analyze(fen, depth, time_ms, _tt)
+    except ValueError as error:
+        result = {'fen': fen, 'error': str(error)}
+    result['index'] = index
+
+    return result
+
+
+def analyze_many(positions, depth=None, time_ms=None, workers=None, tt_mb=16, max_pending=None):
+    # generator of analyze() results plus 'index' in completion order; positions is any
+    # iterable of FEN strings or boards and is only read as fast as the workers finish,
+    # so memory stays bounded whatever its length. Invalid FENs yield {'index', 'fen', 'error'}
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * PENDING_PER_WORKER
+    positions = enumerate(positions)
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(tt_mb,)) as executor:
+        pending = set()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    index, position = next(positions)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                fen = position.fen() if isinstance(position, Board) else position.strip()
+                pending.add(executor.submit(_analyze_task, index, fen, depth, time_ms))
+
+            if not pending:
+                return
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('positions', help="file with one FEN per line, '-' for stdin")
+    parser.add_argument('--depth', type=int, default=None)
+    parser.add_argument('--time-ms', type=int, default=None, help='budget per position')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--hash', type=int, default=16, help='transposition table MB per worker')
+    args = parser.parse_args()
+
+    file = sys.stdin if args.positions == '-' else open(args.positions)
+    with file:
+        lines = (line for line in file if line.strip())
+        for result in analyze_many(lines, args.depth, args.time_ms, args.workers, args.hash):
+            print(json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
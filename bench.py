@@ -0,0 +1,571 @@
+"""Microbenchmarks for the chess core.
+
+    python bench.py makemove [--rounds N] [--history record|dict|both]
+    python bench.py ordering [--depths 4 5 6] [--positions N]
+    python bench.py parallel [--depth 4] [--workers 1 2 4 8] [--positions N]
+    python bench.py coldstart [--module core] [--runs N]
+    python bench.py fen [--positions N] [--rounds N]
+    python bench.py stats [--depth N] [--positions N]
+    python bench.py sprites [--frames N] [--sprites N] [--scale F] [--angle-step DEG]
+    python bench.py render [--frames N] [--sprites N] [--scale F]
+    python bench.py worker [--depth N] [--time-ms N]
+    python bench.py assets [--rounds N]
+    python bench.py objects [--objects N] [--frames N]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+
+from math import inf
+from Board import Board, MoveRecord
+from bitboard import square
+from config import *
+from core import SearchContext, minimax, iterative_deepening
+from TranspositionTable import TranspositionTable
+from SearchStats import SearchStats
+from parallel import ParallelSearch
+
+
+def sample_positions(count=8, plies=16, seed=1):
+    # reproducible middlegame-ish positions reached by random legal play
+    rng = random.Random(seed)
+    boards = [Board(WHITE)]
+    while len(boards) < count:
+        board = Board(rng.choice([WHITE, BLACK]))
+        for _ in range(plies):
+            moves = board.get_moves()
+            if not moves:
+                break
+            board.make_move(*rng.choice(moves))
+        if not board.gameover:
+            boards.append(board)
+
+    return boards
+
+
+def record_history(board, moves):
+    # the MoveRecord pool of make_move: one slotted record per ply, overwritten in place
+    for move in moves:
+        src, dest = square(move[0]), square(move[1])
+        if board.ply == len(board.history):
+            board.history.append(MoveRecord())
+        record = board.history[board.ply]
+        board.ply += 1
+        record.src = src
+        record.dest = dest
+        record.code = board.squares[src]
+        record.whiteScore = board.whiteScore
+        record.blackScore = board.blackScore
+        record.whitePst = board.whitePst
+        record.blackPst = board.blackPst
+        record.whiteKing = board.whiteKing
+        record.blackKing = board.blackKing
+        record.unmoved = board.unmoved
+        record.overState = board.overState
+        record.zobrist = board.zobrist
+        record.halfmove = board.halfmove
+        record.captured = board._do_move(src, dest)
+        board.next_turn()
+
+        board.ply -= 1
+        record = board.history[board.ply]
+        board.whiteScore = record.whiteScore
+        board.blackScore = record.blackScore
+        board.whitePst = record.whitePst
+        board.blackPst = record.blackPst
+        board.whiteKing = record.whiteKing
+        board.blackKing = record.blackKing
+        board.unmoved = record.unmoved
+        board.overState = record.overState
+        board.zobrist = record.zobrist
+        board.halfmove = record.halfmove
+        board._undo_move(record.src, record.dest, record.code, record.captured)
+        board.next_turn()
+
+
+def dict_history(board, moves):
+    # the history before MoveRecord: a fresh dict snapshot per move, popped and copied back
+    history = []
+    for move in moves:
+        src, dest = square(move[0]), square(move[1])
+        state = {
+            'whiteScore': board.whiteScore,
+            'blackScore': board.blackScore,
+            'whitePst': board.whitePst,
+            'blackPst': board.blackPst,
+            'whiteKing': board.whiteKing,
+            'blackKing': board.blackKing,
+            'unmoved': board.unmoved,
+            'overState': board.overState,
+            'zobrist': board.zobrist,
+            'halfmove': board.halfmove,
+        }
+        code = board.squares[src]
+        state['move'] = (src, dest, code, board._do_move(src, dest))
+        history.append(state)
+        board.next_turn()
+
+        state = history.pop()
+        board.whiteScore = state['whiteScore']
+        board.blackScore = state['blackScore']
+        board.whitePst = state['whitePst']
+        board.blackPst = state['blackPst']
+        board.whiteKing = state['whiteKing']
+        board.blackKing = state['blackKing']
+        board.unmoved = state['unmoved']
+        board.overState = state['overState']
+        board.zobrist = state['zobrist']
+        board.halfmove = state['halfmove']
+        board._undo_move(*state['move'])
+        board.next_turn()
+
+
+def bench_makemove(args):
+    positions = [(board, board.get_moves()) for board in sample_positions()]
+
+    def run(step):
+        pairs = 0
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for board, moves in positions:
+                step(board, moves)
+                pairs += len(moves)
+        return pairs, time.perf_counter() - start
+
+    def make_unmake(board, moves):
+        for move in moves:
+            board.make_move(move[0], move[1])
+            board.unmake_move()
+
+    pairs, elapsed = run(make_unmake)
+    print(f'make/unmake: {pairs} pairs in {elapsed:.3f}s -> {pairs / elapsed:,.0f} pairs/s')
+
+    # the undo history alone: both run the same _do_move/_undo_move and only differ
+    # in how the state is saved and restored
+    histories = {'record': record_history, 'dict': dict_history}
+    names = list(histories) if args.history == 'both' else [args.history]
+    rates = {}
+    for name in names:
+        pairs, elapsed = run(histories[name])
+        rates[name] = pairs / elapsed
+        print(f'{name + " history":<15} {pairs} pairs in {elapsed:.3f}s -> {rates[name]:,.0f} pairs/s')
+    if len(rates) == 2:
+        print(f'record history speedup over dict snapshots: x{rates["record"] / rates["dict"]:.2f}')
+
+
+def fixed_depth(board, depth, search):
+    search.begin()
+    search.root_depth = depth
+    minimax(board, depth, -inf, inf, True, board.turnColor, search)
+    return search
+
+
+def bench_ordering(args):
+    positions = sample_positions(args.positions)
+    configs = [
+        ('victim weight only', lambda board, depth: fixed_depth(board, depth, SearchContext(ordering=False))),
+        ('mvv-lva+killers+history', lambda board, depth: fixed_depth(board, depth, SearchContext())),
+        ('+ hash/pv move (id + tt)', lambda board, depth: id_search(board, depth, SearchContext(TranspositionTable(16)))),
+    ]
+
+    print(f'{"ordering":<26}' + ''.join(f'{"depth " + str(depth):>22}' for depth in args.depths))
+    for name, run in configs:
+        row = f'{name:<26}'
+        for depth in args.depths:
+            start = time.perf_counter()
+            nodes = sum(run(board, depth).nodes for board in positions)
+            row += f'{nodes:>12,} {time.perf_counter() - start:>8.2f}s'
+        print(row)
+
+
+def id_search(board, depth, search):
+    iterative_deepening(board, depth, search)
+    return search
+
+
+def bench_parallel(args):
+    positions = sample_positions(args.positions)
+
+    start = time.perf_counter()
+    serial = []
+    for board in positions:
+        search = SearchContext(ordering=False)
+        search.begin()
+        search.root_depth = args.depth
+        serial.append(minimax(board, args.depth, -inf, inf, True, board.turnColor, search))
+    serial_time = time.perf_counter() - start
+    print(f'serial minimax depth {args.depth}: {serial_time:.2f}s')
+
+    for workers in args.workers:
+        with ParallelSearch(workers) as pool:
+            pool.search(positions[0], 1)        # start the worker processes outside the timing
+            start = time.perf_counter()
+            results = [pool.search(board, args.depth) for board in positions]
+            elapsed = time.perf_counter() - start
+
+        same = sum(result[0] == expected[0] and result[1] == expected[1] for result, expected in zip(results, serial))
+        print(f'{workers:>2} workers: {elapsed:.2f}s  speedup x{serial_time / elapsed:.2f}  '
+              f'same move/score {same}/{len(positions)}')
+
+
+def bench_coldstart(args):
+    # fresh interpreter per run, so nothing is cached in sys.modules
+    env = dict(os.environ, SDL_VIDEODRIVER=os.environ.get('SDL_VIDEODRIVER', 'dummy'))
+    command = [sys.executable, '-c', f'import {args.module}']
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+
+    baseline = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        baseline.append(time.perf_counter() - start)
+
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, env=env, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+
+    loaded = subprocess.run([sys.executable, '-c', f'import sys, {args.module}; print("pygame" in sys.modules)'],
+                            env=env, capture_output=True, text=True).stdout.split()[-1]
+    print(f'import {args.module}: median {sorted(timings)[len(timings) // 2] * 1000:.0f} ms '
+          f'(bare interpreter {sorted(baseline)[len(baseline) // 2] * 1000:.0f} ms), pygame loaded: {loaded}')
+
+
+def bench_fen(args):
+    fens = [board.fen() for board in sample_positions(args.positions)]
+    lines = fens * args.rounds
+
+    start = time.perf_counter()
+    for _ in Board.load_fens(lines):
+        pass
+    elapsed = time.perf_counter() - start
+    print(f'set_fen: {len(lines)} positions in {elapsed:.3f}s -> {len(lines) / elapsed:,.0f} positions/s')
+
+    board = Board.from_fen(fens[0])
+    start = time.perf_counter()
+    for fen in lines:
+        board.set_fen(fen)
+        board.fen()
+    elapsed = time.perf_counter() - start
+    print(f'set_fen + fen: {len(lines) / elapsed:,.0f} round trips/s')
+
+
+def bench_stats(args):
+    positions = sample_positions(args.positions)
+    for name, make_stats in (('stats off', lambda: None), ('stats on', SearchStats)):
+        nodes = 0
+        start = time.perf_counter()
+        for board in positions:
+            search = SearchContext(TranspositionTable(16), stats=make_stats())
+            iterative_deepening(board, args.depth, search)
+            nodes += search.nodes
+        elapsed = time.perf_counter() - start
+        print(f'{name:<10} {nodes:>10,} nodes in {elapsed:.2f}s -> {nodes / elapsed:,.0f} nodes/s')
+
+    print(search.stats.to_json(search))
+
+
+def bench_sprites(args):
+    # every sprite turns each frame through a fixed set of angles, so the renderers redo their
+    # surface lookup every frame and only the SurfaceCache can save the transforms
+    import pygame as pg
+
+    for name, cache_bytes in (('transform every frame', None), ('no cache', 0), ('surface cache', 32 << 20)):
+        game = sprite_game(args, surface_cache_bytes=cache_bytes or 0, dirty_rects=False)
+        frame = 0
+
+        def turn():
+            nonlocal frame
+            frame += 1
+            for index, game_object in enumerate(game.game_objects):
+                game_object.transform.rotation = (frame + index) * args.angle_step % 360
+
+        if cache_bytes is None:
+            # what SpriteRenderer did before the cache
+            def step():
+                turn()
+                game.screen.fill(game.background)
+                for game_object in game.game_objects:
+                    transform = game_object.transform
+                    game.screen.blit(pg.transform.rotate(pg.transform.scale_by(game_object.sprite.image, transform.scale),
+                                                         transform.rotation), transform.position)
+                pg.display.flip()
+        else:
+            def step():
+                turn()
+                game.step()
+
+        elapsed, cpu = time_frames(args.frames, step)
+        cache = game.surface_cache
+        print(f'{name:<24} {args.frames / elapsed:>8,.0f} fps  {cpu * 1000 / args.frames:>6.2f} ms cpu/frame  '
+              f'cache {cache.hits} hits {cache.misses} misses {cache.bytes / 1024:,.0f} KB')
+        pg.quit()
+
+
+def sprite_game(args, **options):
+    # pygame only here, the chess benchmarks run without it
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pygame as pg
+    from engine import Game
+    from engine.game_objects import Sprite
+
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'pieces')
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith('.png'))
+    game = Game((800, 600), 'bench', **options)
+    images = [pg.image.load(path) for path in paths]
+    for index in range(args.sprites):
+        sprite = Sprite(images[index % len(images)])
+        sprite.transform.position = ((index % 8) * 64, (index // 8) * 64)
+        sprite.transform.scale = (args.scale, args.scale)
+        game.add_game_object(sprite)
+
+    return game
+
+
+def time_frames(frames, step):
+    start, cpu = time.perf_counter(), time.process_time()
+    for _ in range(frames):
+        step()
+    return time.perf_counter() - start, time.process_time() - cpu
+
+
+def bench_render(args):
+    # full redraw against dirty rects, on idle frames and with one sprite moving
+    import pygame as pg
+
+    for dirty_rects in (False, True):
+        for moving in (False, True):
+            game = sprite_game(args, dirty_rects=dirty_rects)
+            game.step()
+            sprite = game.game_objects[0]
+
+            def step():
+                if moving:
+                    x, y = sprite.transform.position
+                    sprite.transform.position = ((x + 3) % 700, y)
+                game.step()
+
+            elapsed, cpu = time_frames(args.frames, step)
+            name = f'{"dirty rects" if dirty_rects else "full redraw"}, {"one moving" if moving else "idle"}'
+            print(f'{name:<26} {args.frames / elapsed:>8,.0f} fps  {cpu * 1000 / args.frames:>6.3f} ms cpu/frame')
+            pg.quit()
+
+
+def bench_worker(args):
+    # frame times of the game loop while the bot searches, inline against the worker
+    import pygame as pg
+    from engine import GameObject
+    from engine.game_components import SearchWorker
+
+    for mode in ('inline', 'thread', 'process'):
+        game = sprite_game(args)
+        board = Board()
+        frames = []
+        last = time.perf_counter()
+
+        def frame():
+            nonlocal last
+            game.clock.tick(60)
+            pg.event.pump()
+            game.step()
+            now = time.perf_counter()
+            frames.append(now - last)
+            last = now
+
+        start = time.perf_counter()
+        if mode == 'inline':
+            frame()
+            iterative_deepening(board, args.depth, SearchContext(TranspositionTable(TT_SIZE_MB), time_ms=args.time_ms))
+            frame()
+            progress = None
+        else:
+            host = GameObject('bot')
+            worker = SearchWorker(args.depth, args.time_ms, TT_SIZE_MB, processes=mode == 'process')
+            host.add_component(worker)
+            game.add_game_object(host)
+            worker.start()
+            frame()
+            start = time.perf_counter()
+            worker.submit(board)
+            while worker.busy:
+                frame()
+            progress = worker.progress
+            worker.close()
+
+        elapsed = time.perf_counter() - start
+        frames.sort()
+        searched = f'depth {progress.depth} {progress.nodes:,} nodes' if progress else ''
+        print(f'{mode:<8} {elapsed:6.2f} s  {len(frames):>4} frames  {len(frames) / elapsed:5.1f} fps  '
+              f'p95 {frames[int(len(frames) * 0.95)] * 1000:7.1f} ms  max {frames[-1] * 1000:7.1f} ms  {searched}')
+        pg.quit()
+
+
+def bench_assets(args):
+    # piece image start-up: separate PNGs, the atlas built from them and read from its cache
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame as pg
+    import tempfile
+    from engine import AssetManager
+
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'pieces')
+    paths = {name[:-4]: os.path.join(folder, name) for name in sorted(os.listdir(folder)) if name.endswith('.png')}
+    pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    cache_path = os.path.join(tempfile.mkdtemp(), 'pieces.atlas')
+
+    def separate():
+        return {name: pg.transform.smoothscale(pg.image.load(path), IMG_SCALE).convert_alpha()
+                for name, path in paths.items()}
+
+    def atlas(cache):
+        if not cache and os.path.exists(cache_path):
+            os.remove(cache_path)
+        assets = AssetManager(paths, IMG_SCALE, cache_path if cache else None)
+        return {name: assets[name] for name in paths}
+
+    atlas(True)
+    for name, load in (('separate PNGs', separate), ('atlas, built', lambda: atlas(False)),
+                       ('atlas, from cache', lambda: atlas(True))):
+        atlas(True)
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            load()
+        print(f'{name:<18} {(time.perf_counter() - start) * 1000 / args.rounds:7.2f} ms')
+    pg.quit()
+
+
+def bench_objects(args):
+    # per-frame update overhead of a large hierarchy: recursive core_update against the
+    # cached flat update order, memory per object and component lookup by type
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pygame as pg
+    import tracemalloc
+    from engine import Game, GameObject, GameComponent
+
+    class Counter(GameComponent):
+        __slots__ = ('count',)
+
+        def __init__(self):
+            super().__init__('Counter')
+            self.count = 0
+
+        def update(self):
+            self.count += 1
+
+    game = Game((100, 100), 'bench')
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = []
+    for index in range(args.objects):
+        game_object = GameObject(f'object {index}', active=index % 10 != 0)
+        game_object.add_component(Counter())
+        if objects and index % 2:
+            objects[index // 4].add_child(game_object)
+        else:
+            game.add_game_object(game_object)
+        objects.append(game_object)
+    per_object = (tracemalloc.get_traced_memory()[0] - before) / args.objects
+    tracemalloc.stop()
+
+    def recursive():
+        for game_object in game.game_objects:
+            game_object.core_update()
+
+    print(f'{args.objects} objects, {per_object:.0f} bytes each with a Transform and a Counter')
+    for name, update in (('recursive core_update', recursive), ('cached update order', game.update_game_objects)):
+        update()
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            update()
+        print(f'{name:<22} {(time.perf_counter() - start) * 1000 / args.frames:7.3f} ms/frame')
+
+    start = time.perf_counter()
+    for game_object in objects:
+        next((component for component in game_object.components if isinstance(component, Counter)), None)
+    scan = time.perf_counter() - start
+    for game_object in objects:
+        game_object.get_component(Counter)     # the index is built by the first lookup
+    start = time.perf_counter()
+    for game_object in objects:
+        game_object.get_component(Counter)
+    lookup = time.perf_counter() - start
+    print(f'find a component: linear scan {scan * 1e9 / len(objects):.0f} ns, get_component {lookup * 1e9 / len(objects):.0f} ns')
+    pg.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    makemove = commands.add_parser('makemove', help='make/unmake throughput')
+    makemove.add_argument('--rounds', type=int, default=20)
+    makemove.add_argument('--history', choices=['record', 'dict', 'both'], default='both',
+                          help='undo history compared on its own, MoveRecord pool or dict snapshots')
+    makemove.set_defaults(func=bench_makemove)
+
+    ordering = commands.add_parser('ordering', help='searched nodes per move-ordering scheme')
+    ordering.add_argument('--depths', type=int, nargs='+', default=[4, 5, 6])
+    ordering.add_argument('--positions', type=int, default=4)
+    ordering.set_defaults(func=bench_ordering)
+
+    parallel = commands.add_parser('parallel', help='root-split search speedup per worker count')
+    parallel.add_argument('--depth', type=int, default=4)
+    parallel.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parallel.add_argument('--positions', type=int, default=4)
+    parallel.set_defaults(func=bench_parallel)
+
+    coldstart = commands.add_parser('coldstart', help='start-up time of a fresh search worker')
+    coldstart.add_argument('--module', default='core')
+    coldstart.add_argument('--runs', type=int, default=10)
+    coldstart.set_defaults(func=bench_coldstart)
+
+    fen = commands.add_parser('fen', help='FEN loading and export throughput')
+    fen.add_argument('--positions', type=int, default=8)
+    fen.add_argument('--rounds', type=int, default=10000)
+    fen.set_defaults(func=bench_fen)
+
+    stats = commands.add_parser('stats', help='search speed with and without SearchStats')
+    stats.add_argument('--depth', type=int, default=4)
+    stats.add_argument('--positions', type=int, default=4)
+    stats.set_defaults(func=bench_stats)
+
+    sprites = commands.add_parser('sprites', help='sprite rendering with and without the surface cache')
+    sprites.add_argument('--frames', type=int, default=300)
+    sprites.add_argument('--sprites', type=int, default=32)
+    sprites.add_argument('--scale', type=float, default=0.43)
+    sprites.add_argument('--angle-step', type=int, default=15, help='degrees turned per frame')
+    sprites.set_defaults(func=bench_sprites)
+
+    render = commands.add_parser('render', help='full redraw against dirty-rect rendering')
+    render.add_argument('--frames', type=int, default=300)
+    render.add_argument('--sprites', type=int, default=32)
+    render.add_argument('--scale', type=float, default=0.43)
+    render.set_defaults(func=bench_render)
+
+    worker = commands.add_parser('worker', help='game loop frame rate while the bot searches')
+    worker.add_argument('--depth', type=int, default=HARD)
+    worker.add_argument('--time-ms', type=int, default=BOT_TIME_MS)
+    worker.add_argument('--sprites', type=int, default=32)
+    worker.add_argument('--scale', type=float, default=0.43)
+    worker.set_defaults(func=bench_worker)
+
+    assets = commands.add_parser('assets', help='piece image loading with and without the atlas cache')
+    assets.add_argument('--rounds', type=int, default=20)
+    assets.set_defaults(func=bench_assets)
+
+    objects = commands.add_parser('objects', help='engine update overhead with thousands of game objects')
+    objects.add_argument('--objects', type=int, default=5000)
+    objects.add_argument('--frames', type=int, default=200)
+    objects.set_defaults(func=bench_objects)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
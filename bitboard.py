@@ -0,0 +1,172 @@
+"""Bitboard primitives for the position core.
+
+A square is indexed as ``y * 8 + x`` with (0, 0) the top-left tile, the same
+orientation as ``Board.tiles``. Bit ``sq`` of a mask is set when the square is
+occupied/attacked.
+"""
+import random
+
+KING, QUEEN, BISHOP, KNIGHT, ROOK, PAWN = range(6)
+
+# pawn directions: UP moves towards y = 0 (player side), DOWN towards y = 7
+UP, DOWN = 0, 1
+
+FULL = (1 << 64) - 1
+SQUARE_BB = [1 << sq for sq in range(64)]
+SQUARE_COORDS = [(sq & 7, sq >> 3) for sq in range(64)]
+ROW_BB = [0xFF << (8 * y) for y in range(8)]
+
+
+def square(coords):
+    return coords[1] * 8 + coords[0]
+
+
+def iter_bits(mask):
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+
+def _leaper_table(deltas):
+    table = []
+    for sq in range(64):
+        x, y = sq & 7, sq >> 3
+        mask = 0
+        for dx, dy in deltas:
+            if 0 <= x + dx < 8 and 0 <= y + dy < 8:
+                mask |= 1 << ((y + dy) * 8 + x + dx)
+        table.append(mask)
+
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table([(1, -2), (2, -1), (2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2)])
+KING_ATTACKS = _leaper_table([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy])
+PAWN_ATTACKS = [
+    _leaper_table([(-1, -1), (1, -1)]),     # UP
+    _leaper_table([(-1, 1), (1, 1)]),       # DOWN
+]
+
+
+def _ray_table(dx, dy):
+    table = []
+    for sq in range(64):
+        x, y = (sq & 7) + dx, (sq >> 3) + dy
+        mask = 0
+        while 0 <= x < 8 and 0 <= y < 8:
+            mask |= 1 << (y * 8 + x)
+            x += dx
+            y += dy
+        table.append(mask)
+
+    return table
+
+
+# rays going to higher square indices are cut at their lowest blocker,
+# rays going to lower indices at their highest one
+NORTH = _ray_table(0, -1)
+SOUTH = _ray_table(0, 1)
+EAST = _ray_table(1, 0)
+WEST = _ray_table(-1, 0)
+NORTH_EAST = _ray_table(1, -1)
+NORTH_WEST = _ray_table(-1, -1)
+SOUTH_EAST = _ray_table(1, 1)
+SOUTH_WEST = _ray_table(-1, 1)
+
+
+def rook_attacks(sq, occ):
+    attacks = 0
+
+    ray = NORTH[sq]
+    blockers = ray & occ
+    if blockers:
+        ray ^= NORTH[blockers.bit_length() - 1]
+    attacks |= ray
+
+    ray = WEST[sq]
+    blockers = ray & occ
+    if blockers:
+        ray ^= WEST[blockers.bit_length() - 1]
+    attacks |= ray
+
+    ray = SOUTH[sq]
+    blockers = ray & occ
+    if blockers:
+        ray ^= SOUTH[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+
+    ray = EAST[sq]
+    blockers = ray & occ
+    if blockers:
+        ray ^= EAST[(blockers & -blockers).bit_length() - 1]
+
+    return attacks | ray
+
+
+def bishop_attacks(sq, occ):
+    attacks = 0
+
+    ray = NORTH_EAST[sq]
+    blockers = ray & occ
+    if blockers:
+        ray ^= NORTH_EAST[blockers.bit_length() - 1]
+    attacks |= ray
+
+    ray = NORTH_WEST[sq]
+    blockers = ray & occ
+    if blockers:
+        ray ^= NORTH_WEST[blockers.bit_length() - 1]
+    attacks |= ray
+
+    ray = SOUTH_EAST[sq]
+    blockers = ray & occ
+    if blockers:
+        ray ^= SOUTH_EAST[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+
+    ray = SOUTH_WEST[sq]
+    blockers = ray & occ
+    if blockers:
+        ray ^= SOUTH_WEST[(blockers & -blockers).bit_length() - 1]
+
+    return attacks | ray
+
+
+def queen_attacks(sq, occ):
+    return rook_attacks(sq, occ) | bishop_attacks(sq, occ)
+
+
+def _line_tables():
+    # BETWEEN[a][b]: squares strictly between two aligned squares,
+    # LINE[a][b]: the whole rank/file/diagonal through both (0 if not aligned)
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    directions = (NORTH, SOUTH), (SOUTH, NORTH), (EAST, WEST), (WEST, EAST), \
+        (NORTH_EAST, SOUTH_WEST), (SOUTH_WEST, NORTH_EAST), (NORTH_WEST, SOUTH_EAST), (SOUTH_EAST, NORTH_WEST)
+    for rays, opposite in directions:
+        for a in range(64):
+            full = rays[a] | opposite[a] | SQUARE_BB[a]
+            for b in iter_bits(rays[a]):
+                between[a][b] = rays[a] & opposite[b]
+                line[a][b] = full
+
+    return between, line
+
+
+BETWEEN, LINE = _line_tables()
+
+
+def _zobrist_tables(seed=0x5EED):
+    # one random 64-bit key per (piece code, square) and one for black to move;
+    # fixed seed so keys are stable across processes and on-disk files
+    rng = random.Random(seed)
+    table = [[rng.getrandbits(64) for _ in range(64)] for _ in range(16)]
+    # keys are defined with white at the bottom, boards with black at the
+    # bottom use the vertically mirrored table so equal positions hash equal
+    flipped = [[row[sq ^ 56] for sq in range(64)] for row in table]
+
+    return table, flipped, rng.getrandbits(64)
+
+
+ZOBRIST, ZOBRIST_FLIPPED, ZOBRIST_BLACK_TO_MOVE = _zobrist_tables()
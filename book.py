@@ -0,0 +1,181 @@
+"""Opening book: a sorted binary file of (position key, move, weight) entries, memory-mapped.
+
+    python book.py build --out book.bin [--plies 20] [--min-count 1] games.pgn lines.txt ...
+    python book.py probe --book book.bin [--fen FEN]
+
+Input files are PGN, or plain text with one SAN move list per line from the start position.
+Entries are 16 bytes, big endian: zobrist key (8), move (2), weight (2), reserved (4).
+Keys are orientation independent; moves are stored as src * 64 + dest with white at the
+bottom and mirrored on load for boards with black at the bottom.
+"""
+import argparse
+import mmap
+import random
+import re
+import struct
+from collections import Counter
+from Board import Board, STARTPOS
+from bitboard import SQUARE_COORDS, square
+from config import *
+
+ENTRY = struct.Struct('>QHHI')
+KEY = struct.Struct('>Q')
+MAX_WEIGHT = 0xFFFF
+
+# PGN movetext noise: comments, variations are removed separately since they nest
+PGN_TOKENS = re.compile(r'\{[^}]*\}|;[^\n]*|\$\d+|\d+\.(\.\.)?|1-0|0-1|1/2-1/2|\*')
+PGN_HEADER = re.compile(r'\[(\w+)\s+"([^"]*)"\]')
+
+
+class OpeningBook:
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = self.file.seek(0, 2)
+        if size % ENTRY.size:
+            self.file.close()
+            raise ValueError(f'{path} is not a book file')
+
+        self.count = size // ENTRY.size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+
+    def entries(self, key):
+        # [(move code, weight)] stored for key, found by binary search on the sorted keys
+        data = self.data
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(data, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        found = []
+        while low < self.count:
+            entry_key, move, weight, _ = ENTRY.unpack_from(data, low * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((move, weight))
+            low += 1
+
+        return found
+
+
+    def moves(self, board):
+        # [(((x, y), (x, y)), weight)] playable on board, the repetition rule included
+        flip = 0 if board.playerColor == WHITE else 56
+        found = []
+        legal = None
+        for code, weight in self.entries(board.zobrist):
+            move = (SQUARE_COORDS[(code >> 6) ^ flip], SQUARE_COORDS[(code & 63) ^ flip])
+            if legal is None:
+                legal = board.get_moves()
+            if move in legal and weight:
+                found.append((move, weight))
+
+        return found
+
+
+    def pick(self, board, rng=random):
+        # weighted random book move or None when out of book
+        found = self.moves(board)
+        if not found:
+            return None
+
+        return rng.choices([move for move, _ in found], [weight for _, weight in found])[0]
+
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def encode_move(board, move):
+    flip = 0 if board.playerColor == WHITE else 56
+    return (square(move[0]) ^ flip) * 64 + (square(move[1]) ^ flip)
+
+
+def read_games(text):
+    # [(start fen, [san, ...])] from PGN text, or from one move list per line
+    if not re.search(r'^\s*\[', text, re.MULTILINE):
+        return [(STARTPOS, PGN_TOKENS.sub(' ', line).split()) for line in text.splitlines() if line.strip()]
+
+    games = []
+    for block in re.split(r'\n\s*\n(?=\s*\[)', text):
+        headers = dict(PGN_HEADER.findall(block))
+        movetext = PGN_HEADER.sub(' ', block)
+        movetext = PGN_TOKENS.sub(' ', movetext)
+        while '(' in movetext:
+            movetext = re.sub(r'\([^()]*\)', ' ', movetext)
+        sans = movetext.split()
+        if sans:
+            games.append((headers.get('FEN', STARTPOS), sans))
+
+    return games
+
+
+def build(paths, out, plies=20, min_count=1):
+    # counts every (position, move) of the first plies of each game; returns the entry count
+    counts = Counter()
+    board = Board()
+    for path in paths:
+        with open(path) as file:
+            games = read_games(file.read())
+
+        for fen, sans in games:
+            board.set_fen(fen)
+            for san in sans[:plies]:
+                try:
+                    move = board.parse_san(san)
+                except ValueError:
+                    break       # castling, en passant or a broken record: the rest is unusable
+                counts[board.zobrist, encode_move(board, move)] += 1
+                board.make_move(move[0], move[1])
+
+    entries = sorted((key, move, min(count, MAX_WEIGHT)) for (key, move), count in counts.items()
+                     if count >= min_count)
+    with open(out, 'wb') as file:
+        for key, move, weight in entries:
+            file.write(ENTRY.pack(key, move, weight, 0))
+
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help='build a book from PGN or move-list files')
+    build_parser.add_argument('files', nargs='+')
+    build_parser.add_argument('--out', default=BOOK_PATH)
+    build_parser.add_argument('--plies', type=int, default=20, help='book depth in plies')
+    build_parser.add_argument('--min-count', type=int, default=1, help='drop moves seen fewer times')
+
+    probe_parser = commands.add_parser('probe', help='list the book moves of a position')
+    probe_parser.add_argument('--book', default=BOOK_PATH)
+    probe_parser.add_argument('--fen', default=STARTPOS)
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        count = build(args.files, args.out, args.plies, args.min_count)
+        print(f'{count} entries written to {args.out}')
+    else:
+        board = Board.from_fen(args.fen)
+        with OpeningBook(args.book) as book:
+            for move, weight in sorted(book.moves(board), key=lambda item: -item[1]):
+                print(f'{board.move_to_san(move):<8} {board.move_to_uci(move):<6} {weight}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,3 @@
-import pygame
-
-
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 TILE_SIZE = 64
@@ -9,14 +6,20 @@ BLACK = (0, 0 , 0)
 DARK_TILE = (118, 150, 86)
 LIGHT_TILE = (231, 208, 161)
 IMG_SCALE = (TILE_SIZE, TILE_SIZE)
+ATLAS_PATH = 'pieces.atlas'     # piece images packed at IMG_SCALE, rebuilt when the PNGs change
 BOARD_SIZE = TILE_SIZE * 8
 BOARD_X = (SCREEN_WIDTH - BOARD_SIZE) // 2
 BOARD_Y = int((SCREEN_HEIGHT / 2 ) - (BOARD_SIZE / 2))
 
-SCREEN = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 EASY = 2
 MEDIUM = 5
 HARD = 6
+TT_SIZE_MB = 64         # transposition table kept by the bot for the whole game
+BOT_TIME_MS = 3000      # per-move budget, the search stops at this or at the difficulty depth
+SEARCH_STATS = True     # print the bot's search statistics as JSON after every move
+PONDER = True           # the bot keeps searching the expected reply while the player thinks
+BOOK_PATH = 'book.bin'  # opening book used by the bot when the file exists, see book.py
+TABLEBASE_PATH = 'tablebases'     # endgame tables probed by the search, see tablebase.py
 
 def to_coords(x, y):
     return BOARD_X + x * TILE_SIZE, BOARD_Y + y * TILE_SIZE
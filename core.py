@@ -1,48 +1,364 @@
-import pygame
-import os
-from Board import Board
+import threading
+import time
+from math import inf
+from Board import Board, COLORS
+from bitboard import square
 from config import *
+from TranspositionTable import EXACT, LOWER, UPPER, FLIPPED_BOUND
+from MoveOrdering import MoveOrdering, MAX_PLY
+from tablebase import WIN, LOSS
 
+CHECK_EVERY = 1024          # nodes between two clock/stop checks
 
-def evaluate(board: Board, playerColor):
-    if playerColor == WHITE:
-        return board.whiteScore - board.blackScore
-    
-    return board.blackScore - board.whiteScore
+# mate scores count down with the plies to mate, far above any material score
+MATE_SCORE = 100000
+MATE_BOUND = MATE_SCORE - 1000
 
 
-def minimax(board: Board, depth, alpha, beta, bot_turn, max_color): 
-    # top state is given to bot to declare next state 
-    
-    if depth == 0 or board.gameover:
-        return None, evaluate(board, max_color)
-    
+class SearchAborted(Exception):
+    pass
+
+
+class SearchContext:
+    # state shared by every node of one search: budget, stop flag, tt and principal variation
+
+    def __init__(self, tt=None, time_ms=None, nodes=None, stop=None, ordering=True, quiescence=True, positional=True,
+                 stats=None, tablebase=None):
+        self.tt = tt
+        self.tablebase = tablebase  # endgame Tablebase probed below the root, or None
+        self.stats = stats          # SearchStats or None, None costs nothing
+        self.ordering = MoveOrdering() if ordering else None
+        self.quiescence = quiescence        # resolve captures below depth 0 instead of stopping dead
+        self.positional = positional        # piece-square tables on top of material
+        self.time_ms = time_ms
+        self.node_limit = nodes
+        self.stop = stop if stop is not None else threading.Event()
+
+        self.nodes = 0
+        self.next_check = CHECK_EVERY
+        self.depth = 0              # deepest completed iteration
+        self.root_depth = 0
+        self.can_abort = False
+        self.deadline = None
+        self.start = time.perf_counter()
+        self.pv = [[] for _ in range(MAX_PLY + 1)]
+        self.best_pv = []           # principal variation of the deepest completed iteration
+        self.follow_pv = False
+
+
+    def begin(self):
+        self.nodes = 0
+        self.next_check = CHECK_EVERY if self.node_limit is None else min(CHECK_EVERY, self.node_limit)
+        self.depth = 0
+        self.best_pv = []
+        self.start = time.perf_counter()
+        self.deadline = self.start + self.time_ms / 1000 if self.time_ms is not None else None
+        if self.tt is not None:
+            self.tt.new_search()
+        if self.ordering is not None:
+            self.ordering.new_search()
+        if self.stats is not None:
+            self.stats.reset()
+
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+    def extend(self, time_ms):
+        # gives a running search time_ms more from now, e.g. a ponder search on a ponder hit
+        now = time.perf_counter()
+        self.time_ms = (now - self.start) * 1000 + time_ms
+        self.deadline = now + time_ms / 1000
+
+
+    def check(self):
+        self.next_check = self.nodes + CHECK_EVERY
+        # stop at the limit exactly, but once past it (depth 1 can't be cut short) go back
+        # to the usual interval instead of checking every node
+        if self.node_limit is not None and self.nodes < self.node_limit:
+            self.next_check = min(self.next_check, self.node_limit)
+
+        # only iterations after the first may be cut short, so a move is always available
+        if not self.can_abort:
+            return
+        if self.stop.is_set():
+            raise SearchAborted
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchAborted
+
+
+def evaluate(board: Board, playerColor, positional=True):
+    score = board.whiteScore - board.blackScore
+    if positional:
+        score += board.whitePst - board.blackPst
+
+    return score if playerColor == WHITE else -score
+
+
+def quiescence(board: Board, alpha, beta, bot_turn, max_color, search):
+    # captures only; the side to move may also stand pat on the static evaluation
+    search.nodes += 1
+    if search.nodes >= search.next_check:
+        search.check()
+    if search.stats is not None:
+        search.stats.qnodes += 1
+        search.stats.evaluations += 1
+
+    best = evaluate(board, max_color, search.positional)
+    if bot_turn:
+        if best >= beta:
+            return best
+        alpha = max(alpha, best)
+    else:
+        if best <= alpha:
+            return best
+        beta = min(beta, best)
+
+    for move in board.get_captures():
+        board.make_move(move[0], move[1])
+        try:
+            current_eval = quiescence(board, alpha, beta, not bot_turn, max_color, search)
+        finally:
+            board.unmake_move()
+
+        if bot_turn:
+            best = max(best, current_eval)
+            alpha = max(alpha, current_eval)
+        else:
+            best = min(best, current_eval)
+            beta = min(beta, current_eval)
+
+        if alpha >= beta:
+            break
+
+    return best
+
+
+def score_to_tt(score, ply):
+    # mate scores are stored relative to the node, not to the root
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def tablebase_score(result, ply):
+    # side to move's score of a tablebase (DRAW | WIN | LOSS, plies) result
+    outcome, plies = result
+    if outcome == WIN:
+        return MATE_SCORE - ply - plies
+    if outcome == LOSS:
+        return -(MATE_SCORE - ply - plies)
+    return 0
+
+
+def hash_move_allowed(board: Board, move):
+    # guards a transposition table move against index collisions and the repetition rule
+    src = square(move[0])
+    code = board.squares[src]
+    return (code is not None and COLORS[code >> 3] == board.turnColor
+            and board.zobrist_after(src, square(move[1])) not in board.repetitions)
+
+
+def minimax(board: Board, depth, alpha, beta, bot_turn, max_color, search=None):
+    # top state is given to bot to declare next state
+
+    tt = None
+    ply = 0
+    if search is not None:
+        search.nodes += 1
+        if search.nodes >= search.next_check:
+            search.check()
+
+        tt = search.tt
+        ply = search.root_depth - depth
+        pv_line = search.pv[ply]
+        del pv_line[:]
+
+        # exact result of a covered ending, only below the root so there is always a move
+        if search.tablebase is not None and ply > 0:
+            result = search.tablebase.probe(board)
+            if result is not None:
+                if search.stats is not None:
+                    search.stats.tablebase_hits += 1
+                score = tablebase_score(result, ply)
+                return None, score if bot_turn else -score
+
+    if depth == 0:
+        if search is not None:
+            if search.quiescence:
+                return None, quiescence(board, alpha, beta, bot_turn, max_color, search)
+            if search.stats is not None:
+                search.stats.evaluations += 1
+        return None, evaluate(board, max_color, search is None or search.positional)
+
+    hash_move = None
+    if tt is not None:
+        # entries are stored from the side to move's point of view
+        entry = tt.probe(board.zobrist)
+        if entry is not None and entry[3] is not None and hash_move_allowed(board, entry[3]):
+            hash_move = entry[3]
+            # the root only orders by it: a cutoff there would leave a one-move pv
+            if entry[0] >= depth and ply > 0:
+                score, bound = score_from_tt(entry[1], ply), entry[2]
+                if not bot_turn:
+                    score = -score
+                    bound = FLIPPED_BOUND[bound]
+
+                if bound == EXACT:
+                    pv_line.append(hash_move)
+                    return hash_move, score
+                if bound == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    pv_line.append(hash_move)
+                    return hash_move, score
+
+    alpha_orig, beta_orig = alpha, beta
+
     moves = board.get_moves()   #[(src, dest), ...]
+    if board.gameover:          # already known from get_moves, no extra scan
+        loser = board.game_result[0]
+        if loser is None:
+            return None, 0
+        return None, -(MATE_SCORE - ply) if loser == max_color else MATE_SCORE - ply
+
+    if search is not None and search.ordering is not None:
+        moves = search.ordering.order(board, moves, ply)
+
+    if hash_move is not None and hash_move in moves:
+        moves.remove(hash_move)
+        moves.insert(0, hash_move)
+
+    if search is not None and search.follow_pv:
+        # still on the previous iteration's principal variation: try its move first
+        pv_move = search.best_pv[ply] if ply < len(search.best_pv) else None
+        if pv_move in moves:
+            moves.remove(pv_move)
+            moves.insert(0, pv_move)
+        else:
+            search.follow_pv = False
+
     max_eval = -99999999
     min_eval = max_eval * -1
     best_move = None
 
 
-    for move in moves:
+    for index, move in enumerate(moves):
         board.make_move(move[0], move[1])
-        current_eval = minimax(board, depth - 1, alpha, beta, not bot_turn, max_color)[1]
-        board.unmake_move()
+        try:
+            current_eval = minimax(board, depth - 1, alpha, beta, not bot_turn, max_color, search)[1]
+        finally:
+            board.unmake_move()
+
+        improved = False
         if bot_turn:
             if current_eval > max_eval:
                 max_eval = current_eval
                 best_move = move
+                improved = True
 
             alpha = max(alpha, current_eval)
-            if alpha >= beta:
-                break
         else:
             if current_eval < min_eval:
                 min_eval = current_eval
                 best_move = move
+                improved = True
             beta = min(beta, current_eval)
-            if alpha >= beta:
-                break
 
-    return best_move, max_eval if bot_turn else min_eval
+        if search is not None:
+            search.follow_pv = False
+            if improved:
+                pv_line[:] = (move,)
+                pv_line.extend(search.pv[ply + 1])
+
+        if alpha >= beta:
+            if search is not None:
+                if search.ordering is not None:
+                    search.ordering.cutoff(board, move, depth, ply)
+                if search.stats is not None:
+                    search.stats.cutoffs += 1
+                    search.stats.first_move_cutoffs += index == 0
+            break
+
+    result = max_eval if bot_turn else min_eval
+    if tt is not None and best_move is not None:
+        if result <= alpha_orig:
+            bound = UPPER
+        elif result >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+
+        if bot_turn:
+            tt.store(board.zobrist, depth, score_to_tt(result, ply), bound, best_move)
+        else:
+            tt.store(board.zobrist, depth, score_to_tt(-result, ply), FLIPPED_BOUND[bound], best_move)
+
+    return best_move, result
+
+    # best_move: (src, dest)
+
+
+def iterative_deepening(board: Board, max_depth, search=None, on_iteration=None):
+    # searches depth 1, 2, ... max_depth until the budget in search runs out and returns
+    # the result of the deepest completed iteration; on_iteration(search, best_move, score)
+    # is called after every completed one
+    if search is None:
+        search = SearchContext()
+
+    search.begin()
+    if search.stats is not None:
+        search.stats.attach(board, search)
+    try:
+        return _deepen(board, max_depth, search, on_iteration)
+    finally:
+        if search.stats is not None:
+            search.stats.detach()
+
+
+def _deepen(board: Board, max_depth, search, on_iteration):
+    best_move, best_eval = None, None
+
+    for depth in range(1, max_depth + 1):
+        search.root_depth = depth
+        search.can_abort = depth > 1
+        search.follow_pv = True
+        try:
+            move, score = minimax(board, depth, -inf, inf, True, board.turnColor, search)
+        except SearchAborted:
+            break
+
+        if move is None:
+            break
+
+        best_move, best_eval = move, score
+        search.depth = depth
+        search.best_pv = list(search.pv[0])
+        if on_iteration is not None:
+            on_iteration(search, best_move, best_eval)
+
+        # a mate within the searched depth won't get any shorter
+        if abs(best_eval) >= MATE_BOUND and MATE_SCORE - abs(best_eval) <= depth:
+            break
+
+        # the next iteration costs several times this one, don't start what can't finish
+        if search.deadline is not None and search.elapsed() * 2 > search.time_ms / 1000:
+            break
 
-    # best_move: (src, dest)
\ No newline at end of file
+    search.can_abort = False
+    return best_move, best_eval
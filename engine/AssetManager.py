@@ -0,0 +1,119 @@
+import json
+import math
+import os
+import pygame as pg
+
+ATLAS_VERSION = 1
+
+
+class AssetManager:
+    """Images packed into one atlas surface on first use and handed out as subsurfaces.
+
+    With a cache_path the packed and scaled atlas is kept on disk as raw RGBA bytes, so later
+    runs skip decoding and scaling the source images for as long as those are unchanged.
+    """
+
+    def __init__(
+        self,
+        paths: dict[str, str],
+        tile_size: tuple[int, int] | None = None,
+        cache_path: str | None = None,
+    ) -> None:
+        self.paths = paths
+        self.tile_size = tile_size
+        self.cache_path = cache_path
+
+        self.atlas: pg.Surface | None = None
+        self.rects: dict[str, pg.Rect] = {}
+        self.images: dict[str, pg.Surface] = {}
+        self.from_cache = False
+
+    def __getitem__(self, name: str) -> pg.Surface:
+        return self.get(name)
+
+    def get(self, name: str) -> pg.Surface:
+        if self.atlas is None:
+            self.load()
+
+        return self.images[name]
+
+    def load(self):
+        """Build or read the atlas, converted for the display when one is set."""
+        key = self.cache_key()
+        atlas = self.read_cache(key) if self.cache_path else None
+        self.from_cache = atlas is not None
+        if atlas is None:
+            atlas = self.pack()
+            if self.cache_path:
+                self.write_cache(key, atlas)
+
+        if pg.display.get_surface() is not None:
+            atlas = atlas.convert_alpha()
+
+        self.atlas = atlas
+        self.images = {name: atlas.subsurface(rect) for name, rect in self.rects.items()}
+
+    def pack(self) -> pg.Surface:
+        images = {name: pg.image.load(path) for name, path in self.paths.items()}
+        if self.tile_size is not None:
+            images = {name: self.scale(image) for name, image in images.items()}
+
+        # a grid of equal cells is enough for sprite sets of similar sizes
+        cell_width = max(image.get_width() for image in images.values())
+        cell_height = max(image.get_height() for image in images.values())
+        columns = math.ceil(math.sqrt(len(images)))
+        rows = math.ceil(len(images) / columns)
+
+        atlas = pg.Surface((columns * cell_width, rows * cell_height), pg.SRCALPHA, 32)
+        self.rects = {}
+        for index, (name, image) in enumerate(images.items()):
+            rect = image.get_rect(topleft=((index % columns) * cell_width, (index // columns) * cell_height))
+            # onto the fully transparent atlas a blit copies the pixels exactly, alpha included
+            atlas.blit(image, rect)
+            self.rects[name] = rect
+
+        return atlas
+
+    def scale(self, image: pg.Surface) -> pg.Surface:
+        if image.get_bitsize() < 24:
+            return pg.transform.scale(image, self.tile_size)  # smoothscale needs 24 or 32 bits
+
+        return pg.transform.smoothscale(image, self.tile_size)
+
+    def cache_key(self) -> str:
+        sources = []
+        for name, path in self.paths.items():
+            stat = os.stat(path)
+            sources.append([name, path, stat.st_mtime_ns, stat.st_size])
+
+        return json.dumps({"version": ATLAS_VERSION, "tile_size": self.tile_size, "sources": sources})
+
+    def read_cache(self, key: str) -> pg.Surface | None:
+        try:
+            with open(self.cache_path, "rb") as file:
+                header = json.loads(file.readline())
+                data = file.read()
+        except (OSError, ValueError):
+            return None
+
+        size = tuple(header.get("size", ()))
+        if header.get("key") != key or len(size) != 2 or len(data) != size[0] * size[1] * 4:
+            return None
+
+        self.rects = {name: pg.Rect(rect) for name, rect in header["rects"].items()}
+        return pg.image.frombytes(data, size, "RGBA")
+
+    def write_cache(self, key: str, atlas: pg.Surface):
+        header = {
+            "key": key,
+            "size": atlas.get_size(),
+            "rects": {name: list(rect) for name, rect in self.rects.items()},
+        }
+        temporary = f"{self.cache_path}.tmp"
+        try:
+            with open(temporary, "wb") as file:
+                file.write(json.dumps(header).encode() + b"\n")
+                file.write(pg.image.tobytes(atlas, "RGBA"))
+            os.replace(temporary, self.cache_path)
+        except OSError:
+            pass  # the cache only saves time, a read-only location just goes without it
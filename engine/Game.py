@@ -1,16 +1,36 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Hashable
 import pygame as pg
+from .SurfaceCache import SurfaceCache
 
 if TYPE_CHECKING:
     from .GameObject import GameObject
 
 
+def merge_rects(rects: list[pg.Rect], bounds: pg.Rect) -> list[pg.Rect]:
+    """Clip rects to bounds and union the overlapping ones, so no pixel is in two of them."""
+    merged: list[pg.Rect] = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if not rect.width or not rect.height:
+            continue
+
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect = rect.union(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+
+    return merged
+
+
 class Game:
     def __init__(
         self,
         screen_size: tuple[int, int],
         caption: str,
         background=pg.Color(255, 255, 255),
+        surface_cache_bytes=32 * 1024 * 1024,
+        dirty_rects=True,
     ) -> None:
         if not pg.font:
             raise ImportError("pg.font not available")
@@ -26,7 +46,20 @@ class Game:
         self.background = background
         self.screen = pg.display.set_mode(screen_size)
         self.clock = pg.time.Clock()
+        # transformed sprite surfaces shared by every SpriteRenderer of the game
+        self.surface_cache = SurfaceCache(surface_cache_bytes)
         self.game_objects: list["GameObject"] = []
+        # the update calls of every active object and component in core_update order,
+        # rebuilt when the hierarchy or an active flag changes
+        self.update_order: list[Callable[[], None]] | None = None
+
+        # with dirty_rects only the screen regions whose drawing changed are repainted
+        # and sent to the display, otherwise every frame is redrawn in full
+        self.dirty_rects = dirty_rects
+        self.draws: list[tuple[pg.Surface, pg.Rect]] = []
+        self.drawn: dict[Hashable, tuple[pg.Surface, pg.Rect]] = {}
+        self.queued: dict[Hashable, tuple[pg.Surface, pg.Rect]] = {}
+        self.dirty: list[pg.Rect] = [self.screen.get_rect()]
 
     def run(self):
         self.running = True
@@ -38,23 +71,109 @@ class Game:
                 if event.type == pg.QUIT:
                     self.quit()
 
-            self.screen.fill(self.background)
+            self.step()
 
-            for game_object in self.game_objects:
-                game_object.core_update()
+        for game_object in self.game_objects:
+            game_object.core_destroy()
 
+        pg.quit()
+
+    def step(self):
+        """Update every game object and draw the frame they queued."""
+        self.draws = []
+        self.queued = {}
+
+        self.update_game_objects()
+
+        if self.dirty_rects:
+            self.render_dirty()
+        else:
+            self.screen.fill(self.background)
+            self.screen.blits(self.draws, doreturn=False)
             pg.display.flip()
-            pg.display.update()
 
-        pg.quit()
+        self.drawn = self.queued
+
+    def update_game_objects(self):
+        order = self.update_order
+        if order is None:
+            order = self.build_update_order()
+        pending = order
+        ran: set[Callable[[], None]] = set()
+
+        while True:
+            for update in pending:
+                update()
+                if self.update_order is not order:
+                    break
+            else:
+                return
+
+            # something changed mid-frame: finish the frame on the new order without
+            # running anything twice
+            ran.update(pending[: pending.index(update) + 1])
+            order = self.build_update_order()
+            pending = [update for update in order if update not in ran]
+
+    def build_update_order(self) -> list[Callable[[], None]]:
+        order: list[Callable[[], None]] = []
+        for game_object in self.game_objects:
+            game_object.collect_updates(order)
+
+        self.update_order = order
+        return order
+
+    def invalidate_update_order(self):
+        self.update_order = None
+
+    def draw(self, key: Hashable, surface: pg.Surface, rect: pg.Rect):
+        """Queue surface at rect for this frame, key identifies the drawer across frames."""
+        previous = self.drawn.get(key)
+        if previous is None or previous[0] is not surface or previous[1] != rect:
+            if previous is not None:
+                self.dirty.append(previous[1])
+            self.dirty.append(rect)
+
+        self.queued[key] = (surface, rect)
+        self.draws.append((surface, rect))
+
+    def redraw(self):
+        """Repaint the whole screen on the next frame, e.g. after changing the background."""
+        self.dirty.append(self.screen.get_rect())
+
+    def render_dirty(self):
+        # whatever was drawn last frame and not this one leaves a hole to fill
+        for key in self.drawn.keys() - self.queued.keys():
+            self.dirty.append(self.drawn[key][1])
+
+        if not self.dirty:
+            return
+
+        rects = merge_rects(self.dirty, self.screen.get_rect())
+        self.dirty = []
+        for rect in rects:
+            self.screen.fill(self.background, rect)
+
+        # the dirty rects are disjoint, so clipping each draw to them repaints exactly
+        # the changed pixels in the queued order
+        batch = []
+        for surface, rect in self.draws:
+            for index in rect.collidelistall(rects):
+                clip = rect.clip(rects[index])
+                batch.append((surface, clip, clip.move(-rect.x, -rect.y)))
+
+        self.screen.blits(batch, doreturn=False)
+        pg.display.update(rects)
 
     def quit(self):
         self.running = False
 
     def add_game_object(self, game_object: "GameObject"):
-        game_object.game = self
+        game_object.set_game(self)
         self.game_objects.append(game_object)
+        self.invalidate_update_order()
 
     def remove_game_object(self, game_object: "GameObject"):
         self.game_objects.remove(game_object)
-        game_object.game = None
+        game_object.set_game(None)
+        self.invalidate_update_order()
@@ -5,16 +5,28 @@ if TYPE_CHECKING:
 
 
 class GameComponent:
+    __slots__ = ("name", "game_object", "_active")
+
     def __init__(self, name="GameComponent", active=True) -> None:
         self.name = name
         self.game_object: "GameObject" | None = None
-        self.active = active
+        self._active = active
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    @active.setter
+    def active(self, value: bool) -> None:
+        self._active = value
+        if self.game_object is not None and self.game_object.game is not None:
+            self.game_object.game.invalidate_update_order()
 
     def core_update(self):
         if self.game_object is None:
             return
 
-        if self.active is False:
+        if self._active is False:
             return
 
         self.update()
@@ -22,3 +34,7 @@ class GameComponent:
     def update(self):
         """Override this method to add custom update logic."""
         pass
+
+    def destroy(self):
+        """Override this method to release resources when the game ends."""
+        pass
@@ -1,19 +1,26 @@
-from typing import TYPE_CHECKING, Self
+from typing import TYPE_CHECKING, Callable, Self, TypeVar
 
 if TYPE_CHECKING:
     from .Game import Game
-    from .GameComponent import GameComponent
 
+from .GameComponent import GameComponent
 from .game_components import Transform
 
+ComponentType = TypeVar("ComponentType", bound=GameComponent)
+
 
 class GameObject:
+    __slots__ = ("name", "game", "_active", "components", "component_index", "parent", "children", "transform")
+
     def __init__(self, name="GameObject", active=True) -> None:
         self.name = name
         self.game: "Game" | None = None
-        self.active = active
+        self._active = active
 
-        self.components: list["GameComponent"] = []
+        self.components: list[GameComponent] = []
+        # every component under its class and each base class up to GameComponent, built
+        # by the first lookup after a change so objects never queried don't pay for it
+        self.component_index: dict[type, list[GameComponent]] | None = None
         self.parent: Self | None = None
         self.children: list[Self] = []
 
@@ -21,11 +28,21 @@ class GameObject:
         self.add_component(transform)
         self.transform = transform
 
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    @active.setter
+    def active(self, value: bool) -> None:
+        self._active = value
+        if self.game is not None:
+            self.game.invalidate_update_order()
+
     def core_update(self):
         if self.game is None:
             return
 
-        if self.active is False:
+        if self._active is False:
             return
 
         for children in self.children:
@@ -36,27 +53,92 @@ class GameObject:
 
         self.update()
 
+    def collect_updates(self, order: list[Callable[[], None]]):
+        """Append the update calls core_update would make, in the same order, skipping no-ops."""
+        if self._active is False:
+            return
+
+        for child in self.children:
+            child.collect_updates(order)
+
+        for component in self.components:
+            if component._active and type(component).update is not GameComponent.update:
+                order.append(component.update)
+
+        if type(self).update is not GameObject.update:
+            order.append(self.update)
+
     def update(self):
         """Override this method to add custom update logic."""
         pass
 
-    def add_component(self, component: "GameComponent"):
+    def core_destroy(self):
+        for children in self.children:
+            children.core_destroy()
+
+        for component in self.components:
+            component.destroy()
+
+        self.destroy()
+
+    def destroy(self):
+        """Override this method to release resources when the game ends."""
+        pass
+
+    def set_game(self, game: "Game | None"):
+        self.game = game
+        for child in self.children:
+            child.set_game(game)
+
+    def add_component(self, component: GameComponent):
         component.game_object = self
         self.components.append(component)
+        self.component_index = None
+        if self.game is not None:
+            self.game.invalidate_update_order()
 
-    def remove_component(self, component: "GameComponent"):
+    def remove_component(self, component: GameComponent):
         self.components.remove(component)
+        self.component_index = None
         component.game_object = None
+        if self.game is not None:
+            self.game.invalidate_update_order()
+
+    def get_component(self, component_type: type[ComponentType]) -> ComponentType | None:
+        """The first added component that is a component_type, or None."""
+        index = self.component_index if self.component_index is not None else self.build_component_index()
+        components = index.get(component_type)
+        return components[0] if components else None
+
+    def get_components(self, component_type: type[ComponentType]) -> list[ComponentType]:
+        index = self.component_index if self.component_index is not None else self.build_component_index()
+        return list(index.get(component_type, ()))
+
+    def build_component_index(self) -> dict[type, list[GameComponent]]:
+        index: dict[type, list[GameComponent]] = {}
+        for component in self.components:
+            for component_type in type(component).__mro__:
+                index.setdefault(component_type, []).append(component)
+                if component_type is GameComponent:
+                    break
+
+        self.component_index = index
+        return index
 
     def add_child(self, child: Self):
         if child.parent is not None:
             child.parent.remove_child(child)
 
-        child.game = self.game
+        child.set_game(self.game)
         child.parent = self
         self.children.append(child)
+        if self.game is not None:
+            self.game.invalidate_update_order()
 
     def remove_child(self, child: Self):
         self.children.remove(child)
-        child.game = None
+        if self.game is not None:
+            self.game.invalidate_update_order()
+
+        child.set_game(None)
         child.parent = None
@@ -0,0 +1,64 @@
+from collections import OrderedDict
+import pygame as pg
+
+
+class SurfaceCache:
+    """Scaled and rotated copies of source surfaces, least recently used evicted first."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # (id(image), scale x, scale y, rotation) -> (image, surface, size in bytes), and
+        # (id(image),) for the image converted to the display format; the entry holds the
+        # image so its id can't be reused while cached
+        self.surfaces: OrderedDict[tuple, tuple[pg.Surface, pg.Surface, int]] = OrderedDict()
+
+    def get(self, image: pg.Surface, scale, rotation: float) -> pg.Surface:
+        key = (id(image), scale[0], scale[1], rotation)
+        entry = self.surfaces.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return entry[1]
+
+        self.misses += 1
+        surface = self.source(image)
+        if scale[0] != 1 or scale[1] != 1:
+            surface = pg.transform.scale_by(surface, (scale[0], scale[1]))
+        if rotation:
+            surface = pg.transform.rotate(surface, rotation)
+
+        self.store(key, image, surface)
+        return surface
+
+    def source(self, image: pg.Surface) -> pg.Surface:
+        """The image in the display's pixel format, converted once while it stays cached."""
+        key = (id(image),)
+        entry = self.surfaces.get(key)
+        if entry is not None:
+            self.surfaces.move_to_end(key)
+            return entry[1]
+
+        if pg.display.get_surface() is None:
+            return image
+
+        converted = image.convert_alpha()
+        self.store(key, image, converted)
+        return converted
+
+    def store(self, key: tuple, image: pg.Surface, surface: pg.Surface):
+        size = surface.get_width() * surface.get_height() * surface.get_bytesize()
+        if size > self.max_bytes:
+            return
+
+        self.surfaces[key] = (image, surface, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self.surfaces.popitem(last=False)
+            self.bytes -= evicted
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
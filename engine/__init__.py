@@ -1,3 +1,5 @@
 from .Game import Game
 from .GameObject import GameObject
 from .GameComponent import GameComponent
+from .SurfaceCache import SurfaceCache
+from .AssetManager import AssetManager
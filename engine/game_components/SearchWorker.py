@@ -0,0 +1,212 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, NamedTuple
+from ..GameComponent import GameComponent
+
+if TYPE_CHECKING:
+    from Board import Board
+
+REPORT_INTERVAL = 0.1
+
+
+class SearchProgress(NamedTuple):
+    depth: int  # depth being searched
+    nodes: int
+    best_move: tuple | None  # of the deepest completed iteration
+    score: float | None
+    elapsed: float
+
+
+def search_loop(requests, results, cancelled, tt_mb: int, tablebase_path: str | None):
+    """Answer (request id, board, max depth, time ms) requests until None arrives.
+
+    Runs in the worker process or thread and keeps one transposition table across requests.
+    """
+    # the chess modules are only needed where the search runs
+    from core import SearchContext, iterative_deepening
+    from TranspositionTable import TranspositionTable
+    from tablebase import Tablebase
+
+    tt = TranspositionTable(tt_mb)
+    tablebase = Tablebase(tablebase_path) if tablebase_path else None
+    if tablebase is not None and not tablebase.tables:
+        tablebase = None
+
+    while (request := requests.get()) is not None:
+        request_id, board, max_depth, time_ms = request
+        if cancelled.value >= request_id:
+            continue
+
+        search = SearchContext(tt, time_ms=time_ms, tablebase=tablebase)
+        best = [None, None]
+        next_report = search.start + REPORT_INTERVAL
+        check = search.check
+
+        def progress():
+            return SearchProgress(search.root_depth, search.nodes, best[0], best[1], search.elapsed())
+
+        # called every few thousand nodes, which is where a cancel is noticed too
+        def report():
+            nonlocal next_report
+            now = time.perf_counter()
+            if now >= next_report:
+                next_report = now + REPORT_INTERVAL
+                results.put(("progress", request_id, progress()))
+            if cancelled.value >= request_id:
+                search.stop.set()
+            check()
+
+        def on_iteration(search, move, score):
+            best[:] = move, score
+            results.put(("progress", request_id, progress()))
+
+        search.check = report
+        move, score = iterative_deepening(board, max_depth, search, on_iteration)
+        results.put(("done", request_id, (move, score, progress())))
+
+
+class SearchWorker(GameComponent):
+    """Runs bot searches off the game loop and reports them from update() every frame.
+
+    With processes the search runs in a worker process, so the game loop never waits on it;
+    otherwise on a thread, which shares the interpreter with the game loop.
+    """
+
+    __slots__ = (
+        "max_depth",
+        "time_ms",
+        "tt_mb",
+        "tablebase_path",
+        "processes",
+        "on_progress",
+        "on_done",
+        "worker",
+        "requests",
+        "results",
+        "cancelled",
+        "request_id",
+        "pending",
+        "progress",
+        "result",
+    )
+
+    def __init__(
+        self,
+        max_depth: int,
+        time_ms: int | None = None,
+        tt_mb=64,
+        tablebase_path: str | None = None,
+        processes=True,
+        on_progress: Callable[[SearchProgress], None] | None = None,
+        on_done: Callable[[tuple | None, float | None], None] | None = None,
+        name="SearchWorker",
+        active=True,
+    ) -> None:
+        super().__init__(name, active)
+        self.max_depth = max_depth
+        self.time_ms = time_ms
+        self.tt_mb = tt_mb
+        self.tablebase_path = tablebase_path
+        self.processes = processes
+        self.on_progress = on_progress
+        self.on_done = on_done
+
+        self.worker: mp.Process | threading.Thread | None = None
+        self.requests = None
+        self.results = None
+        self.cancelled = mp.RawValue("q", 0)  # requests up to this id are dropped
+        self.request_id = 0
+        self.pending: int | None = None
+        self.progress: SearchProgress | None = None
+        self.result: tuple | None = None
+
+    @property
+    def busy(self) -> bool:
+        return self.pending is not None
+
+    def start(self):
+        """Start the worker, done by the first submit if not called earlier."""
+        if self.worker is not None:
+            return
+
+        if self.processes:
+            self.requests, self.results = mp.Queue(), mp.Queue()
+            worker_type = mp.Process
+        else:
+            self.requests, self.results = queue.Queue(), queue.Queue()
+            worker_type = threading.Thread
+
+        self.worker = worker_type(
+            target=search_loop,
+            args=(self.requests, self.results, self.cancelled, self.tt_mb, self.tablebase_path),
+            daemon=True,
+        )
+        self.worker.start()
+
+    def submit(self, board: "Board") -> int:
+        """Search board for its side to move, cancelling the pending search; returns the request id."""
+        self.cancel()
+        self.start()
+
+        self.request_id += 1
+        self.pending = self.request_id
+        self.progress = None
+        self.result = None
+        self.requests.put((self.request_id, board.copy(), self.max_depth, self.time_ms))
+        return self.request_id
+
+    def cancel(self):
+        """Drop the pending search, e.g. when the game is reset; it stops within a few thousand nodes."""
+        self.cancelled.value = self.request_id
+        self.pending = None
+
+    def update(self):
+        if self.results is None:
+            return
+
+        while True:
+            try:
+                kind, request_id, payload = self.results.get_nowait()
+            except queue.Empty:
+                return
+
+            if request_id != self.pending:
+                continue
+
+            if kind == "progress":
+                self.progress = payload
+                if self.on_progress is not None:
+                    self.on_progress(payload)
+            else:
+                move, score, self.progress = payload
+                self.pending = None
+                self.result = (move, score)
+                if self.on_done is not None:
+                    self.on_done(move, score)
+
+    def destroy(self):
+        self.close()
+
+    def close(self, timeout=1.0):
+        """Cancel the pending search and shut the worker down."""
+        if self.worker is None:
+            return
+
+        self.cancel()
+        self.requests.put(None)
+        self.worker.join(timeout)
+        if self.processes:
+            if self.worker.is_alive():
+                self.worker.terminate()
+                self.requests.cancel_join_thread()  # nobody is left to read what's buffered
+
+            # stops the feeder threads and closes the pipes, a restart makes new ones
+            for channel in (self.requests, self.results):
+                channel.close()
+                channel.join_thread()
+
+        self.worker = None
+        self.requests = None
+        self.results = None
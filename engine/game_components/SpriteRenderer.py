@@ -3,19 +3,26 @@ from ..GameComponent import GameComponent
 
 
 class SpriteRenderer(GameComponent):
+    __slots__ = ("image", "surface", "rect", "source", "version")
+
     def __init__(self, image: pg.Surface, name="SpriteRenderer", active=True) -> None:
         super().__init__(name, active)
         self.image = image
 
+        # what was last queued, reused until the image or the transform changes
+        self.surface: pg.Surface | None = None
+        self.rect: pg.Rect | None = None
+        self.source: pg.Surface | None = None
+        self.version = -1
+
     def update(self):
-        position = self.game_object.transform.position
-        scale = self.game_object.transform.scale
-        rotation = self.game_object.transform.rotation
+        transform = self.game_object.transform
+        game = self.game_object.game
+
+        if self.version != transform.version or self.source is not self.image or self.surface is None:
+            self.surface = game.surface_cache.get(self.image, transform.scale, transform.rotation)
+            self.rect = self.surface.get_rect(topleft=transform.position)
+            self.source = self.image
+            self.version = transform.version
 
-        self.game_object.game.screen.blit(
-            pg.transform.rotate(
-                pg.transform.scale_by(self.image, scale),
-                rotation,
-            ),
-            position,
-        )
+        game.draw(self, self.surface, self.rect)
@@ -3,6 +3,8 @@ from ..GameComponent import GameComponent
 
 
 class Transform(GameComponent):
+    __slots__ = ("version", "_position", "_scale", "_rotation")
+
     def __init__(
         self,
         name="Transform",
@@ -13,6 +15,36 @@ class Transform(GameComponent):
     ) -> None:
         super().__init__(name, active)
 
+        # bumped on every assignment so renderers know when to recompute their bounds;
+        # mutating a vector in place is not seen, assign a new one instead
+        self.version = 0
         self.position = position
         self.scale = scale
         self.rotation = rotation
+
+    @property
+    def position(self) -> Vector2:
+        return self._position
+
+    @position.setter
+    def position(self, value) -> None:
+        self._position = Vector2(value)
+        self.version += 1
+
+    @property
+    def scale(self) -> Vector2:
+        return self._scale
+
+    @scale.setter
+    def scale(self, value) -> None:
+        self._scale = Vector2(value)
+        self.version += 1
+
+    @property
+    def rotation(self) -> float:
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, value: float) -> None:
+        self._rotation = value
+        self.version += 1
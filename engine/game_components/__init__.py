@@ -1,2 +1,3 @@
 from .Transform import Transform
 from .SpriteRenderer import SpriteRenderer
+from .SearchWorker import SearchWorker, SearchProgress
@@ -4,6 +4,8 @@ from ..game_components import SpriteRenderer
 
 
 class Sprite(GameObject):
+    __slots__ = ("sprite",)
+
     def __init__(self, image: pg.Surface, name="Sprite", active=True) -> None:
         super().__init__(name, active)
         self.sprite = SpriteRenderer(image)
@@ -1,5 +1,5 @@
-import pygame as pg
-from engine import Game
+from config import ATLAS_PATH, IMG_SCALE
+from engine import AssetManager, Game
 from engine.game_objects import Sprite
 
 PIECE_TYPES = [
@@ -11,15 +11,14 @@ PIECE_TYPES = [
     "r",
 ]
 
-PIECE_SIZE = (150, 150)
-
 PIECES = [f"{color}{piece}" for piece in PIECE_TYPES for color in ["b", "w"]]
 GAME_SIZE = (500, 500)
-ASSET_PATHS = [f"assets/pieces/{piece}.png" for piece in PIECES]
+ASSET_PATHS = {piece: f"assets/pieces/{piece}.png" for piece in PIECES}
 
-sprites = {path: pg.image.load(path) for path in ASSET_PATHS}
-game_objects = [Sprite(sprite, name=path) for path, sprite in sprites.items()]
 game = Game(GAME_SIZE, caption="Sprite Renderer Example")
+# loaded once the display exists, so the atlas is converted for it
+assets = AssetManager(ASSET_PATHS, tile_size=IMG_SCALE, cache_path=ATLAS_PATH)
+game_objects = [Sprite(assets[piece], name=piece) for piece in PIECES]
 
 for index, game_object in enumerate(game_objects):
     game_object.transform.position = (
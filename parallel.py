@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import inf
+from core import SearchContext, minimax
+
+# best exact root score found so far, shared by every worker of the pool
+_best = None
+
+
+def _init_worker(best):
+    global _best
+    _best = best
+
+
+def _search_root_move(board, move, depth, max_color, quiescence, alpha=None):
+    # searched against the best exact score of the moves finished so far; a score above
+    # the window is exact, one at or below it only an upper bound
+    if alpha is None:
+        alpha = _best.value
+    search = SearchContext(quiescence=quiescence)
+    search.root_depth = depth
+
+    board.make_move(move[0], move[1])
+    score = minimax(board, depth - 1, alpha, inf, False, max_color, search)[1]
+    board.unmake_move()
+
+    if score > alpha:
+        with _best.get_lock():
+            if score > _best.value:
+                _best.value = score
+
+    return score, alpha, search.nodes
+
+
+class ParallelSearch:
+    # fixed depth root splitting over a process pool: each root move is searched by
+    # one worker, the pool is kept alive between moves to amortise process start-up
+
+    def __init__(self, workers=None, quiescence=True):
+        self.workers = workers or os.cpu_count() or 1
+        self.quiescence = quiescence
+        self.best = multiprocessing.Value('d', -inf)
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.best,))
+        self.nodes = 0
+
+
+    def search(self, board, depth):
+        # same (best_move, score) as a serial fixed depth minimax with the same quiescence
+        # setting that visits the root moves in get_moves order
+        moves = board.get_moves()
+        if not moves or depth < 1:
+            search = SearchContext(quiescence=self.quiescence)
+            search.root_depth = depth
+            return minimax(board, depth, -inf, inf, True, board.turnColor, search)
+
+        self.best.value = -inf
+        futures = {self.executor.submit(_search_root_move, board, move, depth, board.turnColor, self.quiescence): index
+                   for index, move in enumerate(moves)}
+
+        scores = [None] * len(moves)
+        windows = [None] * len(moves)
+        self.nodes = 1
+        for future in as_completed(futures):
+            index = futures[future]
+            scores[index], windows[index], nodes = future.result()
+            self.nodes += nodes
+
+        # the serial search keeps the earliest move of the best score; an earlier move that
+        # only tied the best as an upper bound is searched again with an open window
+        best_score = max(scores)
+        for index, move in enumerate(moves):
+            if scores[index] == best_score and scores[index] <= windows[index]:
+                future = self.executor.submit(_search_root_move, board, move, depth, board.turnColor,
+                                              self.quiescence, best_score - 1)
+                scores[index], windows[index], nodes = future.result()
+                self.nodes += nodes
+            if scores[index] == best_score:
+                return move, best_score
+
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,116 @@
+"""Perft: counts the leaf nodes of the legal move tree, to check and time move generation.
+
+    python perft.py --fen FEN --depth N [--divide] [--orientation white|black]
+    python perft.py --suite [--max-depth N]
+
+The suite exits with status 1 on any count that differs from the reference table.
+Counts follow this engine's rules: no castling, no en passant, queen promotions only.
+The repetition rule of get_moves is left out, as in standard perft.
+"""
+import argparse
+import sys
+import time
+from Board import Board, COLORS, STARTPOS, color_index
+from bitboard import SQUARE_COORDS
+from config import *
+
+# fen -> expected leaf counts for depth 1, 2, ...; cross-checked against python-chess
+# with castling, en passant and under-promotions filtered out
+REFERENCE = (
+    (STARTPOS, (20, 400, 8902, 197281)),
+    ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w - - 0 1', (46, 1865, 86585)),
+    ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', (14, 191, 2810, 43087)),
+    ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w - - 0 1', (6, 222, 7855, 305965)),
+    ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w - - 1 8', (40, 1339, 51750)),
+    ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 b - - 0 10', (46, 2079, 89890)),
+    ('4k3/1P6/8/8/8/8/6p1/4K3 b - - 0 1', (6, 27, 220, 1770)),
+)
+
+
+def perft(board: Board, depth):
+    if depth == 0:
+        return 1
+
+    moves = board._legal_moves(color_index(board.turnColor))
+    if depth == 1:
+        return sum(1 for _ in moves)
+
+    nodes = 0
+    for src, dest in list(moves):
+        board.make_move(SQUARE_COORDS[src], SQUARE_COORDS[dest])
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+
+    return nodes
+
+
+def divide(board: Board, depth):
+    # [(uci move, leaf count)] per root move
+    result = []
+    for src, dest in list(board._legal_moves(color_index(board.turnColor))):
+        move = (SQUARE_COORDS[src], SQUARE_COORDS[dest])
+        name = board.move_to_uci(move)
+        board.make_move(move[0], move[1])
+        result.append((name, perft(board, depth - 1)))
+        board.unmake_move()
+
+    return result
+
+
+def timed(board, depth):
+    start = time.perf_counter()
+    nodes = perft(board, depth)
+    return nodes, time.perf_counter() - start
+
+
+def run_suite(max_depth):
+    failures = 0
+    total_nodes = 0
+    total_time = 0.0
+    for fen, counts in REFERENCE:
+        for color in COLORS:
+            board = Board.from_fen(fen, color)
+            for depth, expected in enumerate(counts[:max_depth], 1):
+                nodes, elapsed = timed(board, depth)
+                total_nodes += nodes
+                total_time += elapsed
+                status = 'ok' if nodes == expected else f'FAIL (expected {expected})'
+                failures += nodes != expected
+                print(f'{"white" if color == WHITE else "black"} at bottom  depth {depth}  {nodes:>10,}  '
+                      f'{nodes / elapsed if elapsed else 0:>10,.0f} nodes/s  {status}  {fen}')
+
+    print(f'{total_nodes:,} nodes in {total_time:.2f}s -> {total_nodes / total_time:,.0f} nodes/s, '
+          f'{failures} failure(s)')
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fen', default=REFERENCE[0][0])
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--divide', action='store_true', help='leaf count per root move')
+    parser.add_argument('--orientation', choices=('white', 'black'), default='white',
+                        help='color sitting at the bottom of the board')
+    parser.add_argument('--suite', action='store_true', help='check the reference table, both orientations')
+    parser.add_argument('--max-depth', type=int, default=3, help='deepest reference count checked by --suite')
+    args = parser.parse_args()
+
+    if args.suite:
+        sys.exit(1 if run_suite(args.max_depth) else 0)
+
+    board = Board.from_fen(args.fen, WHITE if args.orientation == 'white' else BLACK)
+    start = time.perf_counter()
+    if args.divide:
+        result = divide(board, args.depth)
+        for name, nodes in result:
+            print(f'{name}: {nodes}')
+        nodes = sum(nodes for _, nodes in result)
+    else:
+        nodes = perft(board, args.depth)
+    elapsed = time.perf_counter() - start
+
+    print(f'perft {args.depth}: {nodes:,} nodes in {elapsed:.3f}s -> {nodes / elapsed if elapsed else 0:,.0f} nodes/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""Self-play: N games between two engine configurations over a process pool.
+
+    python selfplay.py --games 20 --engine-a depth=4 --engine-b depth=3 [--workers N]
+                       [--openings FILE | --random-plies 6] [--pgn games.pgn] [--seed 1]
+
+An engine is given as comma separated key=value pairs, keys: name, depth, time_ms, nodes,
+tt_mb, ordering, quiescence, positional. Every opening is played twice with the colors
+swapped. An openings file holds one opening per line, a FEN or a list of SAN moves from
+the start position.
+"""
+import argparse
+import datetime
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Board import Board, STARTPOS
+from config import *
+from core import SearchContext, iterative_deepening
+from TranspositionTable import TranspositionTable
+
+MAX_PLIES = 300             # adjudicated a draw past this length
+FIFTY_MOVES = 100           # halfmove clock of the fifty-move rule
+
+
+class EngineConfig:
+
+    def __init__(self, name='engine', depth=MEDIUM, time_ms=None, nodes=None, tt_mb=16,
+                 ordering=True, quiescence=True, positional=True):
+        self.name = name
+        self.depth = depth
+        self.time_ms = time_ms
+        self.nodes = nodes
+        self.tt_mb = tt_mb
+        self.ordering = ordering
+        self.quiescence = quiescence
+        self.positional = positional
+
+
+    @classmethod
+    def parse(cls, text, name):
+        # 'depth=4,time_ms=500,quiescence=0'
+        options = {'name': name}
+        for item in filter(None, text.split(',')):
+            key, _, value = item.partition('=')
+            key = key.strip()
+            if key == 'name':
+                options[key] = value
+            elif key in ('depth', 'time_ms', 'nodes', 'tt_mb'):
+                options[key] = int(value)
+            elif key in ('ordering', 'quiescence', 'positional'):
+                options[key] = value.lower() not in ('0', 'false', 'no', 'off')
+            else:
+                raise ValueError(f'unknown engine option {key!r}')
+
+        return cls(**options)
+
+
+    def search_context(self, tt):
+        return SearchContext(tt, time_ms=self.time_ms, nodes=self.nodes, ordering=self.ordering,
+                             quiescence=self.quiescence, positional=self.positional)
+
+
+def random_opening(rng, plies):
+    # SAN moves of a short random game, replayed by the workers
+    board = Board.from_fen(STARTPOS)
+    moves = []
+    for _ in range(plies):
+        legal = board.get_moves()
+        if not legal:
+            break
+        move = rng.choice(legal)
+        moves.append(board.move_to_san(move))
+        board.make_move(move[0], move[1])
+        board.push_history()
+
+    return ' '.join(moves)
+
+
+def load_openings(path):
+    with open(path) as file:
+        return [line.strip() for line in file if line.strip() and not line.startswith('#')]
+
+
+def opening_board(opening):
+    # (board, fen of the start position, SAN moves already played)
+    if '/' in opening:
+        board = Board.from_fen(opening)
+        board.push_history()
+        return board, opening, []
+
+    board = Board.from_fen(STARTPOS)
+    board.push_history()
+    played = opening.split()
+    for san in played:
+        board.make_move(*board.parse_san(san))
+        board.push_history()
+
+    return board, STARTPOS, played
+
+
+def play_game(round_number, opening, white, black):
+    board, fen, played = opening_board(opening)
+    engines = {WHITE: white, BLACK: black}
+    tables = {WHITE: TranspositionTable(white.tt_mb), BLACK: TranspositionTable(black.tt_mb)}
+    sans = list(played)
+    nodes = 0
+
+    while True:
+        moves = board.get_moves()
+        if board.gameover:
+            loser = board.game_result[0]
+            if loser is None:
+                result, reason = '1/2-1/2', 'stalemate'
+            else:
+                result, reason = ('0-1' if loser == WHITE else '1-0'), 'checkmate'
+            break
+        if not moves:
+            # every legal move would repeat a position, which these rules forbid
+            result, reason = '1/2-1/2', 'repetition'
+            break
+        if board.halfmove >= FIFTY_MOVES:
+            result, reason = '1/2-1/2', 'fifty moves'
+            break
+        if len(sans) >= MAX_PLIES:
+            result, reason = '1/2-1/2', 'adjudication'
+            break
+
+        engine = engines[board.turnColor]
+        search = engine.search_context(tables[board.turnColor])
+        best_move, _ = iterative_deepening(board, engine.depth, search)
+        nodes += search.nodes
+        if best_move is None:
+            best_move = moves[0]
+
+        sans.append(board.move_to_san(best_move))
+        board.make_move(best_move[0], best_move[1])
+        board.push_history()
+
+    return {
+        'round': round_number,
+        'white': white.name,
+        'black': black.name,
+        'result': result,
+        'reason': reason,
+        'plies': len(sans),
+        'nodes': nodes,
+        'pgn': to_pgn(round_number, white.name, black.name, fen, sans, result, reason),
+    }
+
+
+def to_pgn(round_number, white, black, fen, sans, result, reason):
+    headers = [
+        ('Event', 'Self-play'),
+        ('Site', 'local'),
+        ('Date', datetime.date.today().strftime('%Y.%m.%d')),
+        ('Round', str(round_number)),
+        ('White', white),
+        ('Black', black),
+        ('Result', result),
+        ('Termination', reason),
+    ]
+    if fen != STARTPOS:
+        headers += [('SetUp', '1'), ('FEN', fen)]
+
+    # numbering follows the start position's side to move and move number
+    fields = fen.split()
+    black_first = len(fields) > 1 and fields[1] == 'b'
+    number = int(fields[5]) if len(fields) > 5 else 1
+    tokens = []
+    for index, san in enumerate(sans):
+        if index == 0 and black_first:
+            tokens.append(f'{number}...')
+        elif (index + black_first) % 2 == 0:
+            if index:
+                number += 1
+            tokens.append(f'{number}.')
+        tokens.append(san)
+    tokens.append(result)
+
+    lines = [f'[{key} "{value}"]' for key, value in headers]
+    lines.append('')
+    line = ''
+    for token in tokens:
+        if len(line) + len(token) + 1 > 80:
+            lines.append(line)
+            line = token
+        else:
+            line = f'{line} {token}' if line else token
+    lines.append(line)
+
+    return '\n'.join(lines) + '\n'
+
+
+def elo_difference(wins, draws, losses):
+    # (elo, 95% margin) of the first engine from its score, infinite when it never lost or won
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, math.inf
+    score = (wins + draws / 2) / games
+    if score in (0.0, 1.0):
+        return (-math.inf if score == 0 else math.inf), math.inf
+
+    elo = -400 * math.log10(1 / score - 1)
+    deviation = math.sqrt((wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games)
+    low = max(1e-9, score - 1.96 * deviation / math.sqrt(games))
+    high = min(1 - 1e-9, score + 1.96 * deviation / math.sqrt(games))
+    margin = (-400 * math.log10(1 / high - 1) + 400 * math.log10(1 / low - 1)) / 2
+
+    return elo, margin
+
+
+def run(engine_a, engine_b, games, workers=None, openings=None, random_plies=6, seed=1, pgn_path=None):
+    # plays games in pairs from the same opening, engine_a white first; returns the summary dict
+    rng = random.Random(seed)
+    pairs = (games + 1) // 2
+    if openings:
+        chosen = [openings[i % len(openings)] for i in range(pairs)]
+    else:
+        chosen = [random_opening(rng, random_plies) for _ in range(pairs)]
+
+    schedule = []
+    for index in range(games):
+        white, black = (engine_a, engine_b) if index % 2 == 0 else (engine_b, engine_a)
+        schedule.append((index + 1, chosen[index // 2], white, black))
+
+    wins = draws = losses = 0
+    results = [None] * games
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers or os.cpu_count() or 1) as executor:
+        futures = {executor.submit(play_game, *game): game[0] for game in schedule}
+        for future in as_completed(futures):
+            game = future.result()
+            results[game['round'] - 1] = game
+            a_white = game['white'] == engine_a.name
+            if game['result'] == '1/2-1/2':
+                draws += 1
+            elif (game['result'] == '1-0') == a_white:
+                wins += 1
+            else:
+                losses += 1
+            print(f'game {game["round"]:>4}: {game["white"]} - {game["black"]} {game["result"]} '
+                  f'({game["reason"]}, {game["plies"]} plies)  +{wins} ={draws} -{losses}', flush=True)
+
+    elapsed = time.perf_counter() - start
+    if pgn_path is not None:
+        with open(pgn_path, 'w') as file:
+            file.write('\n'.join(game['pgn'] for game in results))
+
+    elo, margin = elo_difference(wins, draws, losses)
+    return {
+        'games': games,
+        'wins': wins,
+        'draws': draws,
+        'losses': losses,
+        'elo': elo,
+        'elo_margin': margin,
+        'seconds': elapsed,
+        'games_per_hour': games * 3600 / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--engine-a', default=f'depth={EASY}')
+    parser.add_argument('--engine-b', default=f'depth={EASY}')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--openings', help='file with one FEN or SAN move list per line')
+    parser.add_argument('--random-plies', type=int, default=6, help='random opening length without --openings')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--pgn', help='write every game to this PGN file')
+    args = parser.parse_args()
+
+    engine_a = EngineConfig.parse(args.engine_a, 'A')
+    engine_b = EngineConfig.parse(args.engine_b, 'B')
+    if engine_a.name == engine_b.name:
+        raise SystemExit('the two engines need different names')
+    openings = load_openings(args.openings) if args.openings else None
+
+    summary = run(engine_a, engine_b, args.games, args.workers, openings, args.random_plies, args.seed, args.pgn)
+    print(f'{engine_a.name} vs {engine_b.name}: +{summary["wins"]} ={summary["draws"]} -{summary["losses"]}  '
+          f'elo {summary["elo"]:+.0f} +/- {summary["elo_margin"]:.0f}  '
+          f'{summary["games_per_hour"]:,.0f} games/hour')
+
+
+if __name__ == '__main__':
+    main()
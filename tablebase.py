@@ -0,0 +1,455 @@
+"""Endgame tablebases for pawnless endings of up to 4 pieces, kings included.
+
+    python tablebase.py generate [--pieces 3] [--dir tablebases] [NAME ...]
+    python tablebase.py probe --fen FEN [--dir tablebases]
+
+A table is named after its material, stronger side first ('KQvK', 'KRvKB'); the other
+color order is probed by swapping colors. Tables are generated by retrograde analysis
+over this engine's rules and stored as one byte per position and side to move:
+0 draw, 1 + n won and 128 + n lost in n plies (side to move's view), 255 unused.
+Positions are reduced by the 8 symmetries of the pawnless board, so a table holds
+10 * 64 ** (pieces - 1) * 2 bytes: 82 KB for 3 pieces, 5 MB for 4.
+"""
+import argparse
+import itertools
+import mmap
+import os
+import time
+from Board import Board
+from bitboard import *
+from config import *
+
+DRAW, WIN, LOSS = 0, 1, 2
+WIN_BASE, LOSS_BASE, UNUSED = 1, 128, 255
+MAX_DISTANCE = 126
+
+LETTERS = 'KQBNRP'
+ORDER = (QUEEN, ROOK, BISHOP, KNIGHT)       # order of the non-king pieces in a name
+VALUES = {QUEEN: 9, ROOK: 5, BISHOP: 3, KNIGHT: 3}
+
+
+def _transforms():
+    # the 8 symmetries of the square: mirrors in x and y, then optionally the transpose
+    tables = []
+    for transpose in (False, True):
+        for flip_x in (False, True):
+            for flip_y in (False, True):
+                table = []
+                for sq in range(64):
+                    x, y = sq & 7, sq >> 3
+                    if flip_x:
+                        x = 7 - x
+                    if flip_y:
+                        y = 7 - y
+                    if transpose:
+                        x, y = y, x
+                    table.append(y * 8 + x)
+                tables.append(table)
+
+    return tables
+
+
+TRANSFORMS = _transforms()
+# the smallest image of each square, the white king is always put on one of these 10
+KING_SQUARES = sorted({min(table[sq] for table in TRANSFORMS) for sq in range(64)})
+KING_INDEX = {sq: index for index, sq in enumerate(KING_SQUARES)}
+# per white king square, the symmetries taking it there: one, or two on a diagonal
+KING_TRANSFORMS = [[table for table in TRANSFORMS if table[sq] == min(t[sq] for t in TRANSFORMS)] for sq in range(64)]
+
+
+def table_name(white, black):
+    # (name, swapped): the side with more material is written, and indexed, as white
+    white = sorted(white, key=ORDER.index)
+    black = sorted(black, key=ORDER.index)
+    strength = lambda side: (sum(VALUES[piece] for piece in side), len(side), [-ORDER.index(p) for p in side])
+    swapped = strength(black) > strength(white)
+    if swapped:
+        white, black = black, white
+
+    return 'K' + ''.join(LETTERS[p] for p in white) + 'vK' + ''.join(LETTERS[p] for p in black), swapped
+
+
+def parse_name(name):
+    # 'KQvKR' -> [(color, type)] with the kings first, then white's pieces, then black's
+    white, _, black = name.upper().partition('V')
+    if not white.startswith('K') or not black.startswith('K'):
+        raise ValueError(f'invalid table name: {name!r}')
+
+    layout = [(0, KING), (1, KING)]
+    for color, side in ((0, white[1:]), (1, black[1:])):
+        for letter in side:
+            if letter not in 'QRBN':
+                raise ValueError(f'only pawnless tables are supported: {name!r}')
+            layout.append((color, LETTERS.index(letter)))
+
+    if table_name([t for c, t in layout[2:] if c == 0], [t for c, t in layout[2:] if c == 1]) != (name, False):
+        raise ValueError(f'tables are named stronger side first, in QRBN order: {name!r}')
+    return layout
+
+
+def _groups(layout):
+    # index ranges of identical pieces, kept sorted in a canonical position
+    groups = []
+    start = 2
+    for end in range(3, len(layout) + 1):
+        if end == len(layout) or layout[end] != layout[start]:
+            if end - start > 1:
+                groups.append((start, end))
+            start = end
+
+    return groups
+
+
+def canonical(squares, groups):
+    best = None
+    for table in KING_TRANSFORMS[squares[0]]:
+        image = [table[sq] for sq in squares]
+        for start, end in groups:
+            image[start:end] = sorted(image[start:end])
+        if best is None or image < best:
+            best = image
+
+    return best
+
+
+def position_index(squares):
+    # index of a canonical square list, without the side to move
+    index = KING_INDEX[squares[0]]
+    for sq in squares[1:]:
+        index = index * 64 + sq
+
+    return index
+
+
+def decode(value):
+    # (DRAW | WIN | LOSS, plies) or None for an unused entry
+    if value == UNUSED:
+        return None
+    if value >= LOSS_BASE:
+        return LOSS, value - LOSS_BASE
+    if value >= WIN_BASE:
+        return WIN, value - WIN_BASE
+
+    return DRAW, 0
+
+
+def attacks(piece_type, sq, occ):
+    if piece_type == KING:
+        return KING_ATTACKS[sq]
+    if piece_type == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if piece_type == ROOK:
+        return rook_attacks(sq, occ)
+    if piece_type == BISHOP:
+        return bishop_attacks(sq, occ)
+
+    return queen_attacks(sq, occ)
+
+
+class Table:
+
+    def __init__(self, name, data):
+        self.name = name
+        self.layout = parse_name(name)
+        self.groups = _groups(self.layout)
+        self.data = data
+
+
+    def probe(self, squares, stm):
+        # squares in layout order, stm 0 white / 1 black to move
+        return decode(self.data[position_index(canonical(squares, self.groups)) * 2 + stm])
+
+
+class Tablebase:
+    # every table file of a directory, memory-mapped
+
+    def __init__(self, path=TABLEBASE_PATH):
+        self.path = path
+        self.tables = {}
+        self.files = []
+        self.max_pieces = 0
+        if os.path.isdir(path):
+            for file_name in sorted(os.listdir(path)):
+                if file_name.endswith('.tb'):
+                    file = open(os.path.join(path, file_name), 'rb')
+                    self.files.append(file)
+                    self.add(Table(file_name[:-3], mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)))
+
+
+    def add(self, table):
+        self.tables[table.name] = table
+        self.max_pieces = max(self.max_pieces, len(table.layout))
+
+
+    def probe_pieces(self, placed, stm):
+        # placed: [(color, type, sq)], stm 0 / 1; (DRAW | WIN | LOSS, plies) or None
+        white = [piece_type for color, piece_type, _ in placed if color == 0 and piece_type != KING]
+        black = [piece_type for color, piece_type, _ in placed if color == 1 and piece_type != KING]
+        if not white and not black:
+            return DRAW, 0
+
+        name, swapped = table_name(white, black)
+        table = self.tables.get(name)
+        if table is None:
+            return None
+        if swapped:
+            placed = [(color ^ 1, piece_type, sq) for color, piece_type, sq in placed]
+            stm ^= 1
+
+        squares = [None] * len(table.layout)
+        used = [False] * len(placed)
+        for slot, piece in enumerate(table.layout):
+            for i, (color, piece_type, sq) in enumerate(placed):
+                if not used[i] and (color, piece_type) == piece:
+                    squares[slot] = sq
+                    used[i] = True
+                    break
+
+        return table.probe(squares, stm)
+
+
+    def probe(self, board: Board):
+        # (DRAW | WIN | LOSS, plies) from the side to move's view, None when not covered
+        occupied = board.occupancy[0] | board.occupancy[1]
+        if occupied.bit_count() > self.max_pieces or board.pieces[0][PAWN] or board.pieces[1][PAWN]:
+            return None
+
+        squares = board.squares
+        placed = [(squares[sq] >> 3, squares[sq] & 7, sq) for sq in iter_bits(occupied)]
+        return self.probe_pieces(placed, 0 if board.turnColor == WHITE else 1)
+
+
+    def close(self):
+        for table in self.tables.values():
+            if isinstance(table.data, mmap.mmap):
+                table.data.close()
+        for file in self.files:
+            file.close()
+
+
+def generate(name, tablebase):
+    # retrograde analysis of one table; every table reached by a capture must be in tablebase
+    layout = parse_name(name)
+    groups = _groups(layout)
+    count = len(layout)
+    colors = [color for color, _ in layout]
+    types = [piece_type for _, piece_type in layout]
+    king = (0, 1)                       # slot of each color's king
+    size = len(KING_SQUARES) * 64 ** (count - 1)
+    values = bytearray([UNUSED]) * (size * 2)
+
+    def attacked(squares, occ, sq, by, skip=None):
+        for i in range(count):
+            if colors[i] == by and i != skip and attacks(types[i], squares[i], occ) & SQUARE_BB[sq]:
+                return True
+        return False
+
+    def index_of(squares, stm):
+        return position_index(canonical(squares, groups)) * 2 + stm
+
+    def children(squares, stm):
+        # yields ('table', index) or ('sub', (result, plies)) per legal move of stm
+        occ = 0
+        own = 0
+        for i in range(count):
+            occ |= SQUARE_BB[squares[i]]
+            if colors[i] == stm:
+                own |= SQUARE_BB[squares[i]]
+
+        for i in range(count):
+            if colors[i] != stm:
+                continue
+            for dest in iter_bits(attacks(types[i], squares[i], occ) & ~own):
+                captured = None
+                for j in range(count):
+                    if squares[j] == dest:
+                        captured = j
+                moved = list(squares)
+                moved[i] = dest
+                new_occ = (occ ^ SQUARE_BB[squares[i]]) | SQUARE_BB[dest]
+                if attacked(moved, new_occ, moved[king[stm]], stm ^ 1, captured):
+                    continue
+
+                if captured is None:
+                    yield 'table', index_of(moved, stm ^ 1)
+                else:
+                    placed = [(colors[j], types[j], moved[j]) for j in range(count) if j != captured]
+                    result = tablebase.probe_pieces(placed, stm ^ 1)
+                    if result is None:
+                        raise ValueError(f'{name} needs the tables it reduces to by captures')
+                    yield 'sub', result
+
+    def predecessors(squares, stm):
+        # positions with stm ^ 1 to move that reach this one by a quiet move
+        mover = stm ^ 1
+        occ = 0
+        for sq in squares:
+            occ |= SQUARE_BB[sq]
+        for i in range(count):
+            if colors[i] != mover:
+                continue
+            for origin in iter_bits(attacks(types[i], squares[i], occ) & ~occ):
+                moved = list(squares)
+                moved[i] = origin
+                yield index_of(moved, mover)
+
+    def squares_of(index):
+        squares = []
+        position = index >> 1
+        for _ in range(count - 1):
+            squares.append(position & 63)
+            position >>= 6
+        squares.append(KING_SQUARES[position])
+        squares.reverse()
+        return squares
+
+    buckets = {0: []}           # plies -> indices resolved at that distance
+    capture_wins = {}           # plies -> indices winning by a capture at that distance
+
+    def resolve(index, base, plies):
+        if plies > MAX_DISTANCE:
+            raise ValueError(f'{name}: distance beyond {MAX_DISTANCE} plies')
+        values[index] = base + plies
+        buckets.setdefault(plies, []).append(index)
+
+    # pass 1: legal positions, mates, and what the captures already decide
+    for king_square in KING_SQUARES:
+        for rest in itertools.product(range(64), repeat=count - 1):
+            squares = [king_square, *rest]
+            if len(set(squares)) != count or canonical(squares, groups) != squares:
+                continue
+            if KING_ATTACKS[squares[0]] & SQUARE_BB[squares[1]]:
+                continue
+
+            occ = 0
+            for sq in squares:
+                occ |= SQUARE_BB[sq]
+            for stm in (0, 1):
+                if attacked(squares, occ, squares[king[stm ^ 1]], stm):
+                    continue        # the side not to move would be in check
+
+                index = position_index(squares) * 2 + stm
+                values[index] = 0
+                moves = 0
+                quiet = 0
+                best_capture = None
+                worst_loss = 0
+                drawn = False
+                for kind, child in children(squares, stm):
+                    moves += 1
+                    if kind == 'table':
+                        quiet += 1
+                    elif child[0] == LOSS:
+                        best_capture = child[1] if best_capture is None else min(best_capture, child[1])
+                    elif child[0] == WIN:
+                        worst_loss = max(worst_loss, child[1] + 1)
+                    else:
+                        drawn = True            # a drawing capture, never lost
+
+                if moves == 0:
+                    if attacked(squares, occ, squares[king[stm]], stm ^ 1):
+                        values[index] = LOSS_BASE
+                        buckets[0].append(index)
+                elif best_capture is not None:
+                    capture_wins.setdefault(best_capture + 1, []).append(index)
+                elif quiet == 0 and not drawn:
+                    # only captures, all into won positions for the opponent
+                    resolve(index, LOSS_BASE, worst_loss)
+
+    # pass 2: distance by distance, lost positions make their predecessors won and won ones
+    # may make theirs lost once every move of those is known to lose
+    distance = 0
+    while distance <= max(list(buckets) + list(capture_wins) + [0]):
+        for index in capture_wins.pop(distance, ()):
+            if values[index] == 0:
+                resolve(index, WIN_BASE, distance)
+
+        for index in buckets.pop(distance, ()):
+            squares = squares_of(index)
+            stm = index & 1
+            lost = values[index] >= LOSS_BASE
+            for previous in predecessors(squares, stm):
+                if values[previous] != 0:
+                    continue
+                if lost:
+                    resolve(previous, WIN_BASE, distance + 1)
+                    continue
+
+                longest = 0
+                for kind, child in children(squares_of(previous), previous & 1):
+                    result = decode(values[child]) if kind == 'table' else child
+                    if result is None or result[0] != WIN:
+                        break
+                    longest = max(longest, result[1] + 1)
+                else:
+                    resolve(previous, LOSS_BASE, longest)
+        distance += 1
+
+    return Table(name, values)
+
+
+def table_names(pieces):
+    # every pawnless table of exactly this many pieces, kings included
+    names = set()
+    extra = pieces - 2
+    for white_count in range(extra + 1):
+        for white in itertools.combinations_with_replacement(ORDER, white_count):
+            for black in itertools.combinations_with_replacement(ORDER, extra - white_count):
+                names.add(table_name(list(white), list(black))[0])
+
+    return sorted(names)
+
+
+def generate_all(directory, pieces=3, names=None):
+    os.makedirs(directory, exist_ok=True)
+    tablebase = Tablebase(directory)
+    wanted = names or [name for count in range(3, pieces + 1) for name in table_names(count)]
+    wanted = sorted(wanted, key=lambda name: (len(name), name))
+
+    for name in wanted:
+        path = os.path.join(directory, name + '.tb')
+        if name in tablebase.tables:
+            continue
+
+        start = time.perf_counter()
+        table = generate(name, tablebase)
+        with open(path, 'wb') as file:
+            file.write(table.data)
+        tablebase.add(table)
+
+        wins = sum(1 for value in table.data if WIN_BASE <= value < LOSS_BASE)
+        longest = max((value - WIN_BASE for value in table.data if WIN_BASE <= value < LOSS_BASE), default=0)
+        print(f'{name}: {wins} won positions, longest win {longest} plies, {time.perf_counter() - start:.1f}s',
+              flush=True)
+
+    tablebase.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = commands.add_parser('generate', help='build missing tables')
+    generate_parser.add_argument('names', nargs='*', help="tables to build, e.g. 'KQvKR', default all")
+    generate_parser.add_argument('--pieces', type=int, default=3, choices=(3, 4))
+    generate_parser.add_argument('--dir', default=TABLEBASE_PATH)
+
+    probe_parser = commands.add_parser('probe', help='look a position up')
+    probe_parser.add_argument('--fen', required=True)
+    probe_parser.add_argument('--dir', default=TABLEBASE_PATH)
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        generate_all(args.dir, args.pieces, args.names)
+    else:
+        tablebase = Tablebase(args.dir)
+        result = tablebase.probe(Board.from_fen(args.fen))
+        if result is None:
+            print('not in the tablebase')
+        else:
+            print(f'{("draw", "win", "loss")[result[0]]}' + (f' in {result[1]} plies' if result[0] != DRAW else ''))
+        tablebase.close()
+
+
+if __name__ == '__main__':
+    main()
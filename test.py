@@ -1,10 +1,20 @@
 from Board import Board
+import os
 import time
-from core import minimax
+from core import iterative_deepening, SearchContext
 from config import *
-from math import inf
+from TranspositionTable import TranspositionTable
+from SearchStats import SearchStats
+from book import OpeningBook
+from tablebase import Tablebase
+from Ponderer import Ponderer
 
 board = Board(playerColor=WHITE)
+tt = TranspositionTable(TT_SIZE_MB)
+book = OpeningBook(BOOK_PATH) if os.path.exists(BOOK_PATH) else None
+tablebase = Tablebase(TABLEBASE_PATH)
+ponderer = Ponderer(tt, tablebase if tablebase.tables else None) if PONDER else None
+predicted = None
 board.visualize_board()
 
 # luu y: goc toa do (0, 0) nam o goc tren ben trai cua ban co
@@ -23,15 +33,39 @@ while not board.gameover:
             print('Invalid move!! Try again')
             continue
                         
+    elif book is not None and (best_move := book.pick(board)) is not None:
+        if ponderer is not None:
+            ponderer.stop()
+        board.make_move(best_move[0], best_move[1])
+        print(f'Bot di theo sach khai cuoc {best_move[0]} den {best_move[1]}')
+
     else:
         start = time.time()
-        best_move, max_eval = minimax(board, MEDIUM, -inf, inf, True, board.botColor)
+        pondered = ponderer.hit(board, BOT_TIME_MS) if ponderer is not None else None
+        if pondered is not None:
+            best_move, max_eval, search = pondered
+            print('Bot da doan truoc nuoc di nay, dung lai ket qua suy nghi')
+        else:
+            search = SearchContext(tt, time_ms=BOT_TIME_MS, stats=SearchStats() if SEARCH_STATS else None,
+                                   tablebase=tablebase if tablebase.tables else None)
+            best_move, max_eval = iterative_deepening(board, MEDIUM, search)
 
+        # the player's expected reply, searched while they think
+        predicted = search.best_pv[1] if len(search.best_pv) > 1 else None
         board.make_move(best_move[0], best_move[1])
         print(f'Bot thuc hien nuoc di {best_move[0]} den {best_move[1]} trong {time.time() - start} giay')
+        print(f'Do sau {search.depth}, {search.nodes} nut, TT: {tt.stats()}')
+        if search.stats is not None:
+            print(search.stats.to_json(search))
     
-    board.history_board.append(board.copy())
+    board.push_history()
     board.visualize_board()
 
+    if ponderer is not None and predicted is not None:
+        ponderer.start(board, predicted, MEDIUM)
+        predicted = None
+
+if ponderer is not None:
+    ponderer.stop()
 print(board.game_result)
                 
@@ -0,0 +1,22 @@
+from math import inf
+from Board import Board
+from core import SearchContext, minimax, MATE_SCORE
+from parallel import ParallelSearch
+
+MATE_IN_ONE = '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1'
+
+
+def serial(board, depth):
+    search = SearchContext(ordering=False)
+    search.begin()
+    search.root_depth = depth
+    return minimax(board, depth, -inf, inf, True, board.turnColor, search)
+
+
+def test_root_split_matches_serial_on_mate():
+    board = Board.from_fen(MATE_IN_ONE)
+    with ParallelSearch(2) as pool:
+        for depth in (2, 3):
+            expected = serial(board, depth)
+            assert expected[1] == MATE_SCORE - 1
+            assert pool.search(board, depth) == expected
@@ -0,0 +1,270 @@
+"""UCI front-end: python uci.py, then speak the protocol on stdin/stdout.
+
+The engine's rules have no castling and no en passant and always promote to a queen,
+moves outside those rules are refused with an 'info string'.
+"""
+import sys
+import threading
+from Board import Board, COLORS, STARTPOS
+from bitboard import square
+from config import *
+from core import SearchContext, iterative_deepening, MATE_SCORE, MATE_BOUND
+from tablebase import Tablebase
+from TranspositionTable import TranspositionTable
+
+NAME = 'Chess bot'
+AUTHOR = 'Chess bot authors'
+MAX_DEPTH = 64
+
+# share of the remaining clock spent on one move when the GUI gives no movestogo
+MOVES_TO_GO = 30
+MOVE_OVERHEAD_MS = 50
+
+
+class UciEngine:
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.lock = threading.Lock()
+        self.tt = TranspositionTable(TT_SIZE_MB)
+        self.tablebase = Tablebase(TABLEBASE_PATH)
+        self.board = Board.from_fen(STARTPOS)
+        self.board.push_history()
+        self.stop = threading.Event()
+        self.release = threading.Event()    # lets an infinite or ponder search send its bestmove
+        self.thread = None
+        self.search_context = None
+        self.ponder_budget = None           # time of a ponder search once the reply is played
+
+
+    def send(self, line):
+        with self.lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+
+    def run(self, lines=sys.stdin):
+        for line in lines:
+            if not self.command(line.strip()):
+                break
+        self.stop_search()
+
+
+    def command(self, line):
+        # False once the engine should exit
+        tokens = line.split()
+        if not tokens:
+            return True
+
+        name, args = tokens[0], tokens[1:]
+        if name == 'uci':
+            self.send(f'id name {NAME}')
+            self.send(f'id author {AUTHOR}')
+            self.send(f'option name Hash type spin default {TT_SIZE_MB} min 1 max 1024')
+            self.send('option name Ponder type check default false')
+            self.send('uciok')
+        elif name == 'isready':
+            self.send('readyok')
+        elif name == 'setoption':
+            self.set_option(args)
+        elif name == 'ucinewgame':
+            self.stop_search()
+            self.tt.clear()
+        elif name == 'position':
+            self.stop_search()
+            self.set_position(args)
+        elif name == 'go':
+            self.stop_search()
+            self.go(args)
+        elif name == 'ponderhit':
+            self.ponder_hit()
+        elif name == 'stop':
+            self.stop_search()
+        elif name == 'quit':
+            return False
+        else:
+            self.send(f'info string unknown command {name}')
+
+        return True
+
+
+    def set_option(self, args):
+        # setoption name <id> [value <x>]
+        text = ' '.join(args)
+        name, _, value = text.partition(' value ')
+        name = name.removeprefix('name ').strip().lower()
+        if name == 'hash':
+            try:
+                self.tt = TranspositionTable(max(1, int(value)))
+            except ValueError:
+                self.send(f'info string invalid hash size {value}')
+        else:
+            self.send(f'info string unknown option {name}')
+
+
+    def set_position(self, args):
+        # position startpos|fen <fen> [moves <m1> <m2> ...]
+        if 'moves' in args:
+            index = args.index('moves')
+            args, moves = args[:index], args[index + 1:]
+        else:
+            moves = []
+
+        if args[:1] == ['startpos']:
+            fen = STARTPOS
+        elif args[:1] == ['fen']:
+            fen = ' '.join(args[1:])
+        else:
+            self.send('info string position expects startpos or fen')
+            return
+
+        try:
+            board = Board.from_fen(fen)
+        except ValueError as error:
+            self.send(f'info string {error}')
+            return
+
+        board.push_history()
+        for text in moves:
+            try:
+                src, dest = board.parse_uci(text)
+            except ValueError as error:
+                self.send(f'info string {error}')
+                break
+
+            if not self.legal(board, src, dest):
+                self.send(f'info string illegal move {text}')
+                break
+
+            board.make_move(src, dest)
+            board.push_history()
+
+        self.board = board
+
+
+    def legal(self, board, src, dest):
+        # repeated positions are allowed here, the GUI is the judge of the game
+        code = board.squares[square(src)]
+        return (code is not None and COLORS[code >> 3] == board.turnColor
+                and dest in board.valid_moves_at(src)
+                and not board.checked_after_move(src, dest, board.turnColor))
+
+
+    def go(self, args):
+        limits = {}
+        infinite = ponder = False
+        i = 0
+        while i < len(args):
+            if args[i] in ('infinite', 'ponder'):
+                infinite = True
+                ponder = ponder or args[i] == 'ponder'
+                i += 1
+                continue
+            try:
+                limits[args[i]] = int(args[i + 1])
+            except (IndexError, ValueError):
+                pass
+            i += 2
+
+        depth = limits.get('depth', MAX_DEPTH)
+        time_ms = None if infinite else self.time_budget(limits)
+        nodes = None if infinite else limits.get('nodes')
+        search = SearchContext(self.tt, time_ms=time_ms, nodes=nodes, stop=self.stop,
+                               tablebase=self.tablebase if self.tablebase.tables else None)
+        # a ponder search runs on the opponent's time, its own clock starts at ponderhit
+        self.ponder_budget = self.time_budget(limits) if ponder else None
+
+        self.stop.clear()
+        self.release.clear()
+        self.search_context = search
+        self.thread = threading.Thread(target=self.search, args=(self.board.copy(), depth, search, infinite),
+                                       daemon=True)
+        self.thread.start()
+
+
+    def time_budget(self, limits):
+        if 'movetime' in limits:
+            return max(1, limits['movetime'] - MOVE_OVERHEAD_MS)
+
+        own, increment = ('wtime', 'winc') if self.board.turnColor == WHITE else ('btime', 'binc')
+        if own not in limits:
+            return None
+
+        remaining = limits[own]
+        budget = remaining // limits.get('movestogo', MOVES_TO_GO) + limits.get(increment, 0) // 2
+        return max(1, min(budget, remaining - MOVE_OVERHEAD_MS))
+
+
+    def search(self, board, depth, search, infinite):
+        best_move, _ = iterative_deepening(board, depth, search,
+                                           lambda search, move, score: self.report(board, search, score))
+        if best_move is None:
+            moves = board.get_moves()
+            best_move = moves[0] if moves else None
+
+        # a GUI expects bestmove only after stop (or ponderhit) when it asked for an infinite search
+        if infinite:
+            self.release.wait()
+        if best_move is None:
+            self.send('bestmove 0000')
+            return
+
+        text = 'bestmove ' + board.move_to_uci(best_move)
+        pv = search.best_pv
+        if len(pv) > 1 and pv[0] == best_move:
+            board.make_move(best_move[0], best_move[1])
+            text += ' ponder ' + board.move_to_uci(pv[1])
+            board.unmake_move()
+        self.send(text)
+
+
+    def ponder_hit(self):
+        # the expected reply was played: the running ponder search becomes a normal one
+        if self.thread is None:
+            return
+        if self.ponder_budget is None:
+            # no clock given with go ponder: answer with what was found so far
+            self.stop.set()
+            self.release.set()
+            return
+
+        self.search_context.extend(self.ponder_budget)
+        self.ponder_budget = None
+        self.release.set()
+
+
+    def report(self, board, search, score):
+        elapsed = search.elapsed()
+        ms = int(elapsed * 1000)
+        nps = int(search.nodes / elapsed) if elapsed > 0 else 0
+        if abs(score) >= MATE_BOUND:
+            plies = MATE_SCORE - abs(score)
+            score_text = f'mate {(plies + 1) // 2 if score > 0 else -((plies + 1) // 2)}'
+        else:
+            score_text = f'cp {score * 10}'
+        self.send(f'info depth {search.depth} score {score_text} nodes {search.nodes} nps {nps} '
+                  f'time {ms} pv {self.pv_text(board, search.best_pv)}')
+
+
+    def pv_text(self, board, pv):
+        # moves are named on the position they are played in, promotions need it
+        names = []
+        for move in pv:
+            names.append(board.move_to_uci(move))
+            board.make_move(move[0], move[1])
+        for _ in pv:
+            board.unmake_move()
+
+        return ' '.join(names)
+
+
+    def stop_search(self):
+        if self.thread is not None:
+            self.stop.set()
+            self.release.set()
+            self.thread.join()
+            self.thread = None
+
+
+if __name__ == '__main__':
+    UciEngine().run()